@@ -4,3 +4,19 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.conf import settings
+        from django.core.exceptions import ImproperlyConfigured
+        from django.db.backends.signals import connection_created
+        from .instrumentation import instrument_serializers
+        from .metrics import count_connection
+
+        if settings.PERF_INSTRUMENTATION:
+            instrument_serializers()
+
+        if settings.METRICS_ENABLED:
+            # Per-process counters would look like resets whenever scrapes hit another worker
+            if not settings.SHARED_CACHE:
+                raise ImproperlyConfigured("METRICS_ENABLED requires a redis:// CACHE_URL to aggregate counters")
+            connection_created.connect(count_connection)
@@ -0,0 +1,212 @@
+import statistics
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from urllib.parse import urlencode
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_databases, setup_test_environment, teardown_databases,
+    teardown_test_environment,
+)
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from .cache import STATIONS_SCOPE, bump_data_versions, latest_measurement_key, station_scope
+from .forecasts import forecast_cache_key
+from .models import Measurement, Station
+from .rollups import rebuild_stats
+
+BULK_CREATE_ROWS = 1000
+# Scenario name -> (max SQL queries, max p95 milliseconds); query counts are exact
+# today, so any N+1 or extra lookup fails the run
+BUDGETS = {
+    "latest (cold)": (1, 50),
+    "latest (warm)": (0, 20),
+    "stats (cold)": (2, 100),
+    "stats (warm)": (0, 20),
+    "stats monthly (cold)": (2, 100),
+    "list": (4, 150),
+    "list cursor": (3, 150),
+    "stations (cold)": (3, 50),
+    "stations (warm)": (1, 20),
+    "forecast (cold)": (5, 100),
+    "forecast (warm)": (1, 20),
+    "bulk-create": (9, 1000),
+    "bulk-delete": (13, 1000),
+}
+# Canned Meteoblue basic-day response, so the forecast endpoint runs without the network
+METEOBLUE_STUB = {
+    "metadata": {
+        "latitude": 48.1, "longitude": 17.1, "modelrun_utc": "2024-01-01 00:00",
+        "utc_timeoffset": 1.0, "generation_time_ms": 2.0,
+    },
+    "data_day": {
+        "time": ["2024-01-01"] * 7,
+        **{
+            field: [1] * 7 for field in (
+                "temperature_instant", "precipitation", "predictability", "temperature_mean",
+                "temperature_max", "temperature_min", "felttemperature_mean", "relativehumidity_mean",
+                "windspeed_mean", "sealevelpressure_mean", "precipitation_hours", "pictocode",
+                "winddirection", "uvindex",
+            )
+        },
+    },
+}
+
+
+@contextmanager
+def throwaway_database(verbosity=0):
+    """Run the block against a freshly migrated test database that is destroyed afterwards.
+
+    The configured database is never read or written.
+    """
+    setup_test_environment()
+    old_config = setup_databases(verbosity, interactive=False, aliases={DEFAULT_DB_ALIAS}, serialized_aliases=set())
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity)
+        teardown_test_environment()
+
+
+@contextmanager
+def private_cache():
+    """Run the block with the default cache under a key prefix of its own.
+
+    The configured cache may be shared with running workers, so their entries are
+    neither read nor cleared; keys written under the prefix are removed afterwards.
+    Response caching is on, as with Redis: the benchmark is a single process.
+    """
+    prefix = f"benchmark-{uuid.uuid4().hex}"
+    config = {**settings.CACHES[DEFAULT_CACHE_ALIAS], "KEY_PREFIX": prefix}
+    with override_settings(CACHES={**settings.CACHES, DEFAULT_CACHE_ALIAS: config}, SHARED_CACHE=True):
+        try:
+            yield
+        finally:
+            backend = caches[DEFAULT_CACHE_ALIAS]
+            if isinstance(backend, RedisCache):
+                client = backend._cache.get_client(write=True)
+                keys = list(client.scan_iter(match=f"{prefix}:*"))
+                if keys:
+                    client.delete(*keys)
+
+
+def generate_fleet(stations, months, interval_minutes=10):
+    """Create ``stations`` stations owned by one user, with readings and rollups.
+
+    Each station gets one measurement every ``interval_minutes`` for the last
+    ``months`` months, inserted with one set-based statement. Only call this
+    inside throwaway_database().
+    """
+    user = User.objects.create_user(username="benchmark")
+    created = Station.objects.bulk_create(
+        Station(
+            name=f"benchmark-{index}", latitude=48 + index % 100 / 100, longitude=17 + index // 100 / 100,
+            city_name="Benchmark", user=user,
+        )
+        for index in range(stations)
+    )
+    station_ids = [station.pk for station in created]
+    end = timezone.now()
+    start = end - timedelta(days=30 * months)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {Measurement._meta.db_table} (station_id, timestamp, temperature, humidity, created_at)
+            SELECT station_id, ts, 20 + 10 * sin(extract(epoch FROM ts) / 86400.0 + station_id), 60, now()
+            FROM unnest(%s::bigint[]) AS station_id,
+                 generate_series(%s::timestamptz, %s::timestamptz, make_interval(mins => %s)) AS ts
+            """,
+            [station_ids, start, end, interval_minutes],
+        )
+        rows = cursor.rowcount
+    rebuild_stats(station_ids)
+    return user, created, rows
+
+
+def forget_station(station):
+    """Drop the cached responses of one station; the rest of the cache is left alone."""
+    cache.delete_many([latest_measurement_key(station.pk), forecast_cache_key(station.pk)])
+    bump_data_versions([station_scope(station.pk), STATIONS_SCOPE])
+
+
+def scenarios(station, now):
+    """(name, method, path, params or body, forgets the station's cache entries before each call)."""
+    day = timezone.localdate(now)
+    month_ago = (now - timedelta(days=30)).isoformat()
+    rows = [
+        {"station": station.pk, "temperature": 20.5, "humidity": 60, "timestamp": (now + timedelta(seconds=i)).isoformat()}
+        for i in range(BULK_CREATE_ROWS)
+    ]
+    delete_params = {"station": station.pk, "timestamp__gt": now.isoformat()}
+    stats_params = {
+        "station": station.pk, "timestamp__gt": (day - timedelta(days=30)).isoformat(), "timestamp__lt": day.isoformat(),
+    }
+    return [
+        ("latest (cold)", "get", "/api/measurements/latest/", {"station": station.pk}, True),
+        ("latest (warm)", "get", "/api/measurements/latest/", {"station": station.pk}, False),
+        ("stats (cold)", "get", "/api/measurements/stats/", stats_params, True),
+        ("stats (warm)", "get", "/api/measurements/stats/", stats_params, False),
+        ("stats monthly (cold)", "get", "/api/measurements/stats/", {**stats_params, "resolution": "month"}, True),
+        ("list", "get", "/api/measurements/", {"station": station.pk, "timestamp__gt": month_ago}, True),
+        ("list cursor", "get", "/api/measurements/", {"station": station.pk, "pagination": "cursor"}, True),
+        ("stations (cold)", "get", "/api/stations/", {}, True),
+        ("stations (warm)", "get", "/api/stations/", {}, False),
+        ("forecast (cold)", "get", "/api/forecast/", {"station": station.pk}, True),
+        ("forecast (warm)", "get", "/api/forecast/", {"station": station.pk}, False),
+        ("bulk-create", "post", "/api/measurements/bulk-create/?mode=fast", rows, False),
+        ("bulk-delete", "delete", f"/api/measurements/bulk-delete/?{urlencode(delete_params)}", None, False),
+    ]
+
+
+def run_scenario(client, station, method, path, data, cold, repeat):
+    timings = []
+    queries = 0
+    status = None
+    for _ in range(repeat):
+        if cold:
+            forget_station(station)
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            if method == "post":
+                response = client.post(path, data, format="json")
+            else:
+                response = getattr(client, method)(path, data)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = max(queries, len(context))
+        status = response.status_code
+    return status, queries, timings
+
+
+def run_benchmarks(user, station, budgets, repeat=5):
+    """Time every scenario against its (max queries, max p95 ms) budget."""
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"JWT {AccessToken.for_user(user)}")
+    now = timezone.now()
+    results = []
+    with mock.patch("api.forecasts.fetch_basic_day", return_value=METEOBLUE_STUB), \
+            mock.patch("api.forecasts.lookup_city_name", return_value="Benchmark"):
+        for name, method, path, data, cold in scenarios(station, now):
+            # Writes run once: repeating bulk-create would only measure conflicting inserts
+            status, queries, timings = run_scenario(
+                client, station, method, path, data, cold, repeat if method == "get" else 1
+            )
+            max_queries, max_ms = budgets[name]
+            p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+            results.append({
+                "name": name,
+                "status": status,
+                "queries": queries,
+                "p50_ms": round(statistics.median(timings), 2),
+                "p95_ms": round(p95, 2),
+                "budget_queries": max_queries,
+                "budget_ms": max_ms,
+                "passed": status < 400 and queries <= max_queries and p95 <= max_ms,
+            })
+    return results
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from .instrumentation import record_cache
+from .models import Measurement
+from .renderers import render_json
+from .serializers import MeasurementValuesSerializer
+
+logger = logging.getLogger(__name__)
+
+# Names passed to cached(); their hit/miss counters are reported by cache_stats()
+CACHE_NAMES = ("forecast", "latest_measurement", "stats", "stations")
+CACHE_OUTCOMES = ("hit", "stale", "miss")
+# How long one loader may hold the refresh lock of a key, and how often waiters poll
+LOCK_TIMEOUT = 30
+LOCK_POLL_INTERVAL = 0.05
+# With the default per-process LocMemCache, entries only live long enough for
+# the other workers to pick up writes they did not see themselves.
+LATEST_MEASUREMENT_TIMEOUT = 60
+# Cached responses are invalidated through data versions; the timeout only bounds
+# staleness from writes that bypass the API (e.g. `manage.py rebuild_stats`).
+# Responses are only cached with a shared cache (settings.SHARED_CACHE): a
+# per-process version bump would leave the other workers serving stale data.
+RESPONSE_CACHE_TIMEOUT = 300
+
+
+def increment(key, amount=1):
+    if not cache.add(key, amount, timeout=None):
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            cache.set(key, amount, timeout=None)
+
+
+def count(name, outcome):
+    # Kept in the cache itself so every worker adds to the same counters
+    increment(f"cache_stats_{name}_{outcome}")
+    record_cache(outcome)
+
+
+def cache_stats():
+    """Hit/stale/miss counters of every named cache, summed over all workers."""
+    keys = {f"cache_stats_{name}_{outcome}": (name, outcome) for name in CACHE_NAMES for outcome in CACHE_OUTCOMES}
+    values = cache.get_many(list(keys))
+    stats = {name: dict.fromkeys(CACHE_OUTCOMES, 0) for name in CACHE_NAMES}
+    for key, (name, outcome) in keys.items():
+        stats[name][outcome] = values.get(key, 0)
+    return stats
+
+
+def store(key, value, timeout, soft_timeout=None):
+    fresh_until = time.time() + soft_timeout if soft_timeout is not None else None
+    cache.set(key, {"value": value, "fresh_until": fresh_until}, timeout=timeout)
+    return value
+
+
+def lock_key(key):
+    return f"{key}_lock"
+
+
+def refresh(key, loader, timeout, soft_timeout):
+    try:
+        store(key, loader(), timeout, soft_timeout)
+    except Exception:
+        logger.exception("Background refresh of %s failed", key)
+    finally:
+        cache.delete(lock_key(key))
+        connection.close()
+
+
+def cached(name, key, loader, timeout, soft_timeout=None):
+    """Return the value cached under ``key``, calling ``loader`` at most once at a time per key.
+
+    Entries older than ``soft_timeout`` are served stale while one background
+    thread refreshes them; ``timeout`` is the hard expiry. On a miss, only the
+    request holding the key's lock runs ``loader``; the others wait for its
+    result. ``loader`` returning None is not cached.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        if entry["fresh_until"] is None or entry["fresh_until"] > time.time():
+            count(name, "hit")
+            return entry["value"]
+        count(name, "stale")
+        if cache.add(lock_key(key), 1, timeout=LOCK_TIMEOUT):
+            threading.Thread(target=refresh, args=(key, loader, timeout, soft_timeout), daemon=True).start()
+        return entry["value"]
+    count(name, "miss")
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while not cache.add(lock_key(key), 1, timeout=LOCK_TIMEOUT):
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry["value"]
+        if time.monotonic() > deadline:
+            return loader()
+    try:
+        value = loader()
+        if value is not None:
+            store(key, value, timeout, soft_timeout)
+        return value
+    finally:
+        cache.delete(lock_key(key))
+
+
+def data_version_key(scope):
+    return f"data_version_{scope}"
+
+
+def data_version(scope):
+    key = data_version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        # A version lost to eviction restarts from the clock, never from a number
+        # that responses may still be cached under
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_data_versions(scopes):
+    """Invalidate every cached response built from the given data scopes."""
+    if not settings.SHARED_CACHE:
+        return
+    for scope in set(scopes):
+        key = data_version_key(scope)
+        if not cache.add(key, time.time_ns(), timeout=None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), timeout=None)
+
+
+def cached_response(name, request, build, scope, vary=""):
+    """Serve a GET from rendered JSON bytes cached per view, query string and data version.
+
+    ``build`` returns a DRF Response; only 200 responses are cached. ``vary``
+    separates callers that see different data for the same query string.
+    Without a shared cache, ``build`` runs on every request.
+    """
+    if not settings.SHARED_CACHE:
+        return build()
+    params = urlencode(sorted(request.query_params.lists()), doseq=True)
+    digest = hashlib.md5(params.encode()).hexdigest()
+    version = data_version(scope)
+    key = f"response_{name}_{vary}_{scope}_{version}_{digest}"
+    content = cache.get(key)
+    if content is not None:
+        count(name, "hit")
+        return HttpResponse(content, content_type="application/json")
+    count(name, "miss")
+    response = build()
+    if response.status_code != 200:
+        return response
+    content = render_json(response.data)
+    cache.set(key, content, timeout=RESPONSE_CACHE_TIMEOUT)
+    return HttpResponse(content, content_type="application/json")
+
+
+STATIONS_SCOPE = "stations"
+
+
+def station_scope(station_id):
+    return f"station_{station_id}"
+
+
+def latest_measurement_key(station_id):
+    return f"latest_measurement_{station_id}"
+
+
+def build_latest_entry(row):
+    # Last-Modified is the reading's own timestamp, so it never depends on when the entry was cached
+    data = MeasurementValuesSerializer(row).data
+    etag = hashlib.md5(json.dumps(data, sort_keys=True).encode()).hexdigest()
+    return {"content": render_json(data), "etag": etag, "last_modified": row["timestamp"].timestamp()}
+
+
+def latest_measurement_row(station_id):
+    return MeasurementValuesSerializer.values(
+        Measurement.objects.filter(station_id=station_id).order_by("-timestamp")
+    ).first()
+
+
+def get_latest_measurement(station_id):
+    """Return the cached latest reading of a station, loading it on a miss."""
+    def load():
+        row = latest_measurement_row(station_id)
+        if row is None:
+            return None
+        return build_latest_entry(row)
+
+    return cached("latest_measurement", latest_measurement_key(station_id), load, LATEST_MEASUREMENT_TIMEOUT)
+
+
+def refresh_latest_measurements(station_ids):
+    """Recompute the latest reading of every station touched by a write and drop its cached responses."""
+    station_ids = set(station_ids)
+    bump_data_versions(station_scope(station_id) for station_id in station_ids)
+    for station_id in station_ids:
+        key = latest_measurement_key(station_id)
+        row = latest_measurement_row(station_id)
+        if row is None:
+            cache.delete(key)
+            continue
+        store(key, build_latest_entry(row), LATEST_MEASUREMENT_TIMEOUT)
+
+
+def clear_latest_measurement(station_id):
+    bump_data_versions([station_scope(station_id)])
+    cache.delete(latest_measurement_key(station_id))
@@ -0,0 +1,38 @@
+import csv
+import json
+from .serializers import MeasurementValuesSerializer
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FIELDS = list(MeasurementValuesSerializer.fields)
+
+
+class Echo:
+    """File-like object whose write() hands the value back, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def iter_measurement_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    serializer = MeasurementValuesSerializer()
+    rows = MeasurementValuesSerializer.values(queryset.order_by("timestamp", "id"))
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield list(serializer.to_representation(row).values())
+
+
+def stream_csv(queryset):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in iter_measurement_rows(queryset):
+        yield writer.writerow(row)
+
+
+def stream_ndjson(queryset):
+    for row in iter_measurement_rows(queryset):
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row))) + "\n"
+
+
+EXPORTERS = {
+    "csv": (stream_csv, "text/csv"),
+    "ndjson": (stream_ndjson, "application/x-ndjson"),
+}
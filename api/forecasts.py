@@ -0,0 +1,132 @@
+import math
+import threading
+import time
+from datetime import timezone as dt_timezone
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .geocoding import lookup_city_name
+from .meteoblue import fetch_basic_day
+from .models import ForecastData, Station
+from .renderers import render_json
+from .serializers import ForecastDataSerializer
+
+DAY_FIELDS = [
+    "time", "temperature_instant", "precipitation", "predictability", "temperature_mean",
+    "temperature_max", "temperature_min", "felttemperature_mean", "relativehumidity_mean",
+    "windspeed_mean", "sealevelpressure_mean", "precipitation_hours", "pictocode",
+    "winddirection", "uvindex",
+]
+# Forecasts are stored per cell of this many degrees (~5 km); Meteoblue snaps to its own grid anyway
+GRID_SIZE = 0.05
+
+
+def grid_cell(lat, lon):
+    """Quantize coordinates to the GRID_SIZE degree cell that keys stored forecasts."""
+    return math.floor(lat / GRID_SIZE + 0.5), math.floor(lon / GRID_SIZE + 0.5)
+
+
+def cell_center(cell):
+    return round(cell[0] * GRID_SIZE, 6), round(cell[1] * GRID_SIZE, 6)
+
+
+def fresh_forecast(lat, lon):
+    """The newest forecast fetched today for the grid cell of these coordinates, if any."""
+    grid_lat, grid_lon = grid_cell(lat, lon)
+    today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return (
+        ForecastData.objects.filter(grid_lat=grid_lat, grid_lon=grid_lon, created_at__gte=today)
+        .order_by("-modelrun_utc")
+        .first()
+    )
+
+
+def parse_modelrun(value):
+    # Meteoblue sends "YYYY-MM-DD HH:MM" in UTC; parse it so fresh rows serialize like stored ones
+    modelrun = parse_datetime(value)
+    if modelrun is not None and timezone.is_naive(modelrun):
+        modelrun = timezone.make_aware(modelrun, dt_timezone.utc)
+    return modelrun or value
+
+
+def forecast_cache_key(station_id):
+    return f"forecast_json_{station_id}"
+
+
+def forecast_json(forecast):
+    """Render a forecast once to the JSON bytes served and cached by the forecast endpoint."""
+    return render_json(ForecastDataSerializer(forecast).data)
+
+
+def store_forecast(data, city_name, cell):
+    """Upsert the forecast of one grid cell and model run; a refetch overwrites the row."""
+    metadata = data["metadata"]
+    forecast = ForecastData(
+        grid_lat=cell[0],
+        grid_lon=cell[1],
+        latitude=metadata["latitude"],
+        longitude=metadata["longitude"],
+        city_name=city_name,
+        modelrun_utc=parse_modelrun(metadata["modelrun_utc"]),
+        utc_timeoffset=metadata["utc_timeoffset"],
+        generation_time_ms=metadata["generation_time_ms"],
+        daily={field: data["data_day"][field] for field in DAY_FIELDS},
+    )
+    ForecastData.objects.bulk_create(
+        [forecast],
+        update_conflicts=True,
+        unique_fields=["grid_lat", "grid_lon", "modelrun_utc"],
+        update_fields=[
+            "latitude", "longitude", "city_name", "utc_timeoffset", "generation_time_ms", "daily", "created_at",
+        ],
+    )
+    return forecast
+
+
+def fetch_forecast(lat, lon, throttle=None):
+    """Fetch, geocode and store the forecast for the grid cell of a coordinate pair.
+
+    The cell centre is sent upstream, so every station in the cell gets the same
+    forecast. ``throttle`` is called before each upstream request.
+    """
+    cell = grid_cell(lat, lon)
+    if throttle:
+        throttle()
+    data = fetch_basic_day(*cell_center(cell))
+    metadata = data["metadata"]
+    if throttle:
+        throttle()
+    city_name = lookup_city_name(metadata["latitude"], metadata["longitude"])
+    return store_forecast(data, city_name, cell)
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.lock = threading.Lock()
+        self.next_slot = 0
+
+    def __call__(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def station_cells():
+    """Group station ids by the grid cell of their coordinates."""
+    cells = {}
+    for pk, lat, lon in Station.objects.order_by("pk").values_list("pk", "latitude", "longitude"):
+        cells.setdefault(grid_cell(lat, lon), []).append(pk)
+    return cells
+
+
+def stale_cells(cells, max_age):
+    """Drop cells that have a forecast fetched within ``max_age``."""
+    fresh = set(
+        ForecastData.objects.filter(created_at__gte=timezone.now() - max_age).values_list("grid_lat", "grid_lon")
+    )
+    return {cell: station_ids for cell, station_ids in cells.items() if cell not in fresh}
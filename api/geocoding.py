@@ -0,0 +1,94 @@
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection, transaction
+from .cache import STATIONS_SCOPE, bump_data_versions
+from .meteoblue import MeteoblueError, search_city_name
+from .models import GeocodedLocation, Station
+
+# Coordinates are resolved per cell of this many degrees (~100 m)
+GEOCODE_GRID_SIZE = 0.001
+LRU_SIZE = 4096
+# Background lookups for station writes; a small pool keeps upstream concurrency bounded
+executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="geocode")
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+names = LRUCache(LRU_SIZE)
+
+
+def geocode_cell(lat, lon):
+    return math.floor(lat / GEOCODE_GRID_SIZE + 0.5), math.floor(lon / GEOCODE_GRID_SIZE + 0.5)
+
+
+def known_city_name(lat, lon):
+    """City name from the in-process LRU or the geocode table, or None without a network call."""
+    cell = geocode_cell(lat, lon)
+    name = names.get(cell)
+    if name is None:
+        name = (
+            GeocodedLocation.objects.filter(grid_lat=cell[0], grid_lon=cell[1])
+            .values_list("city_name", flat=True)
+            .first()
+        )
+        if name is not None:
+            names.set(cell, name)
+    return name
+
+
+def lookup_city_name(lat, lon):
+    """City name of the coordinates, searched once per cell; failed searches return '' and are not cached."""
+    name = known_city_name(lat, lon)
+    if name is not None:
+        return name
+    try:
+        name = search_city_name(lat, lon)
+    except MeteoblueError:
+        return ""
+    cell = geocode_cell(lat, lon)
+    GeocodedLocation.objects.update_or_create(grid_lat=cell[0], grid_lon=cell[1], defaults={"city_name": name})
+    names.set(cell, name)
+    return name
+
+
+def resolve_station_city_name(station_id, lat, lon):
+    try:
+        name = lookup_city_name(lat, lon)
+        # Skip if the station moved again in the meantime; that write queued its own lookup
+        if Station.objects.filter(pk=station_id, latitude=lat, longitude=lon).update(city_name=name):
+            bump_data_versions([STATIONS_SCOPE])
+    finally:
+        connection.close()
+
+
+def assign_city_name(station):
+    """Set the station's city name from cache, or resolve it in the background after commit."""
+    name = known_city_name(station.latitude, station.longitude)
+    if name is None:
+        args = (station.pk, station.latitude, station.longitude)
+        transaction.on_commit(lambda: executor.submit(resolve_station_city_name, *args))
+    elif name != station.city_name:
+        Station.objects.filter(pk=station.pk).update(city_name=name)
+        station.city_name = name
+    return station
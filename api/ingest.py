@@ -0,0 +1,165 @@
+import csv
+import json
+from itertools import islice
+from django.db import transaction
+from django.utils.timezone import now
+from rest_framework import serializers
+from rest_framework.fields import SkipField, empty
+from .models import Measurement, Station
+from .rollups import record_measurements
+
+BULK_INSERT_BATCH_SIZE = 1000
+STREAM_CHUNK_SIZE = 1000
+MAX_REPORTED_REJECTIONS = 100
+
+
+class MeasurementRowSerializer(serializers.Serializer):
+    station = serializers.IntegerField()
+    timestamp = serializers.DateTimeField(required=False)
+    temperature = serializers.FloatField()
+    humidity = serializers.FloatField()
+
+
+class InvalidRow:
+    """Placeholder for a row that could not be parsed from a streamed upload."""
+
+    def __init__(self, message):
+        self.message = message
+
+
+def station_owners(station_ids):
+    return dict(Station.objects.filter(pk__in=station_ids).values_list("pk", "user_id"))
+
+
+def validate_rows(rows, user, owners=None, offset=0):
+    """Validate measurement rows in one pass without touching the database per row.
+
+    Station ownership is resolved with a single query for all referenced stations
+    not already present in ``owners`` (station id -> user id), which callers can
+    share between batches. Returns the valid rows as unsaved ``Measurement``
+    instances and a list of rejected rows with their index and errors.
+    """
+    fields = MeasurementRowSerializer().fields
+    parsed = []
+    rejected = []
+    for index, row in enumerate(rows, start=offset):
+        if not isinstance(row, dict):
+            message = row.message if isinstance(row, InvalidRow) else "Expected an object."
+            rejected.append({"index": index, "errors": {"non_field_errors": [message]}})
+            continue
+        values = {}
+        errors = {}
+        for name, field in fields.items():
+            try:
+                values[name] = field.run_validation(row.get(name, empty))
+            except SkipField:
+                pass
+            except serializers.ValidationError as exc:
+                errors[name] = exc.detail
+        if errors:
+            rejected.append({"index": index, "errors": errors})
+        else:
+            parsed.append((index, values))
+
+    if owners is None:
+        owners = {}
+    missing = {values["station"] for _, values in parsed} - owners.keys()
+    if missing:
+        owners.update(station_owners(missing))
+    measurements = []
+    for index, values in parsed:
+        owner = owners.get(values["station"])
+        if owner is None:
+            error = f'Invalid pk "{values["station"]}" - object does not exist.'
+        elif owner != user.pk:
+            error = "The station does not belong to the current user."
+        else:
+            measurements.append(Measurement(
+                station_id=values["station"],
+                timestamp=values.get("timestamp") or now(),
+                temperature=values["temperature"],
+                humidity=values["humidity"],
+            ))
+            continue
+        rejected.append({"index": index, "errors": {"station": [error]}})
+    rejected.sort(key=lambda item: item["index"])
+    return measurements, rejected
+
+
+def insert_measurements(measurements, batch_size=BULK_INSERT_BATCH_SIZE):
+    with transaction.atomic():
+        measurements = Measurement.objects.bulk_create(measurements, batch_size=batch_size)
+        record_measurements(measurements)
+    return measurements
+
+
+def decode_line(line):
+    try:
+        return line.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return InvalidRow("Invalid UTF-8.")
+
+
+def iter_ndjson(lines):
+    for line in lines:
+        line = decode_line(line)
+        if isinstance(line, InvalidRow):
+            yield line
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield InvalidRow("Invalid JSON.")
+
+
+def iter_csv(lines):
+    """Parse one row per line, so an undecodable line only rejects its own row.
+
+    Empty cells are treated as missing so optional columns like timestamp can be left blank.
+    """
+    lines = iter(lines)
+    header = next(lines, None)
+    if header is None:
+        return
+    # Garbled column names simply fail validation of every row
+    fieldnames = next(csv.reader([header.decode("utf-8-sig", errors="replace")]), [])
+    for line in lines:
+        line = decode_line(line)
+        if isinstance(line, InvalidRow):
+            yield line
+            continue
+        values = next(csv.reader([line]), None)
+        if not values:
+            continue
+        if len(values) > len(fieldnames):
+            yield InvalidRow("Row has more values than the header.")
+            continue
+        yield {key: value for key, value in zip(fieldnames, values) if value != ""}
+
+
+def ingest_stream(rows, user, chunk_size=STREAM_CHUNK_SIZE):
+    """Validate and insert rows from an iterator, committing every ``chunk_size`` rows.
+
+    Only one chunk is held in memory at a time. Returns the ingestion summary
+    and the ids of the stations that received measurements.
+    """
+    owners = {}
+    station_ids = set()
+    inserted = 0
+    rejected = []
+    rejected_count = 0
+    offset = 0
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        measurements, chunk_rejected = validate_rows(chunk, user, owners, offset=offset)
+        insert_measurements(measurements)
+        inserted += len(measurements)
+        station_ids.update(measurement.station_id for measurement in measurements)
+        rejected_count += len(chunk_rejected)
+        rejected += chunk_rejected[:MAX_REPORTED_REJECTIONS - len(rejected)]
+        offset += len(chunk)
+    summary = {"inserted": inserted, "rejected_count": rejected_count, "rejected": rejected}
+    return summary, station_ids
@@ -0,0 +1,84 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Metrics of the request being handled, set by api.middleware.PerformanceMiddleware.
+# Threads started during a request do not inherit it, so background work is not counted.
+current_metrics = ContextVar("current_metrics", default=None)
+# Set while a serializer's .data is being timed, so nested serializers are not counted twice
+serializing = ContextVar("serializing", default=False)
+
+
+class RequestMetrics:
+    def __init__(self, capture_sql=False):
+        self.capture_sql = capture_sql
+        self.queries = 0
+        self.db_ms = 0.0
+        self.statements = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.meteoblue_calls = 0
+        self.meteoblue_ms = 0.0
+        self.serialize_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.queries += 1
+            self.db_ms += elapsed
+            if self.capture_sql:
+                self.statements.append((round(elapsed, 2), sql))
+
+
+def record_cache(outcome):
+    metrics = current_metrics.get()
+    if metrics is not None:
+        if outcome == "miss":
+            metrics.cache_misses += 1
+        else:
+            metrics.cache_hits += 1
+
+
+@contextmanager
+def timed(field):
+    """Add the time spent in the block to a RequestMetrics ``*_ms`` field, if a request is instrumented."""
+    metrics = current_metrics.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            setattr(metrics, field, getattr(metrics, field) + (time.perf_counter() - started) * 1000)
+            if field == "meteoblue_ms":
+                metrics.meteoblue_calls += 1
+
+
+def timed_serializer_data(data):
+    """Wrap a serializer ``data`` property getter to add its time, minus queries it runs, to ``serialize_ms``."""
+    def wrapper(serializer):
+        metrics = current_metrics.get()
+        if metrics is None or serializing.get():
+            return data(serializer)
+        token = serializing.set(True)
+        db_ms = metrics.db_ms
+        started = time.perf_counter()
+        try:
+            return data(serializer)
+        finally:
+            serializing.reset(token)
+            elapsed = (time.perf_counter() - started) * 1000
+            metrics.serialize_ms += elapsed - (metrics.db_ms - db_ms)
+
+    return wrapper
+
+
+def instrument_serializers():
+    """Time every DRF serializer, called from ApiConfig.ready() when PERF_INSTRUMENTATION is set."""
+    from rest_framework.serializers import BaseSerializer
+
+    # Serializer.data and ListSerializer.data both build their output through BaseSerializer.data
+    BaseSerializer.data = property(timed_serializer_data(BaseSerializer.data.fget))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.partitions import apply_retention
+
+
+class Command(BaseCommand):
+    help = "Remove raw measurements older than each station's retention_days"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--archive", action="store_true", help="Detach expired partitions instead of dropping them")
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be removed")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            partitions, deleted = apply_retention(archive=options["archive"], dry_run=options["dry_run"])
+        verb = "detached" if options["archive"] else "dropped"
+        if options["dry_run"]:
+            verb = f"would be {verb}"
+        for name in partitions:
+            self.stdout.write(f"Partition {name} {verb}")
+        rows = "rows would be deleted" if options["dry_run"] else "rows deleted"
+        self.stdout.write(self.style.SUCCESS(f"{len(partitions)} partitions {verb}, {deleted} {rows}"))
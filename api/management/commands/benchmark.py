@@ -0,0 +1,36 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from api.benchmark import BUDGETS, generate_fleet, private_cache, run_benchmarks, throwaway_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the hot endpoints against a synthetic fleet in a throwaway test database "
+        "and check query-count and latency budgets"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stations", type=int, default=20, help="Stations in the synthetic fleet")
+        parser.add_argument("--months", type=int, default=3, help="Months of measurements per station")
+        parser.add_argument("--interval", type=int, default=10, help="Minutes between measurements")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed calls per read scenario")
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        with throwaway_database(options["verbosity"] - 1), private_cache():
+            user, stations, rows = generate_fleet(options["stations"], options["months"], options["interval"])
+            self.stdout.write(f"Generated {len(stations)} stations with {rows} measurements")
+            results = run_benchmarks(user, stations[0], BUDGETS, repeat=options["repeat"])
+        for result in results:
+            line = (
+                f"{result['name']:<22} {result['status']}  {result['queries']:>3}/{result['budget_queries']} queries"
+                f"  p50 {result['p50_ms']:>8.2f} ms  p95 {result['p95_ms']:>8.2f}/{result['budget_ms']} ms"
+            )
+            self.stdout.write(self.style.SUCCESS(line) if result["passed"] else self.style.ERROR(line))
+        if options["output"]:
+            fixture = {key: options[key] for key in ("stations", "months", "interval", "repeat")}
+            with open(options["output"], "w") as output:
+                json.dump({"fixture": {**fixture, "measurements": rows}, "results": results}, output, indent=2)
+        failed = [result["name"] for result in results if not result["passed"]]
+        if failed:
+            raise CommandError(f"Over budget: {', '.join(failed)}")
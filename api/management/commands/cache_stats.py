@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from api.cache import cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit/stale/miss counters of the shared response caches"
+
+    def handle(self, *args, **options):
+        for name, outcomes in cache_stats().items():
+            lookups = sum(outcomes.values())
+            ratio = (outcomes["hit"] + outcomes["stale"]) / lookups if lookups else 0
+            self.stdout.write(
+                f"{name}: {outcomes['hit']} hits, {outcomes['stale']} stale, {outcomes['miss']} misses ({ratio:.1%} served from cache)"
+            )
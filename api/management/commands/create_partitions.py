@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.partitions import create_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = "Create upcoming monthly partitions of the measurement table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months-ahead", type=int, default=3, help="How many months after the current one to prepare")
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            raise CommandError("The measurement table is not partitioned (see `manage.py partition_measurements`)")
+        created = create_partitions(options["months_ahead"])
+        for name in created:
+            self.stdout.write(f"Created {name}")
+        self.stdout.write(self.style.SUCCESS(f"{len(created)} partitions created"))
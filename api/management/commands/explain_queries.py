@@ -0,0 +1,54 @@
+from datetime import datetime, time, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from api.filters import MeasurementFilter
+from api.models import Measurement, Station
+from api.rollups import daily_stats
+
+
+class Command(BaseCommand):
+    help = "Print EXPLAIN ANALYZE output for the hot measurement queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--station", type=int, help="Station id (defaults to the station with the most recent measurement)")
+        parser.add_argument("--date", help="Day to use for date-based queries, YYYY-MM-DD (defaults to today)")
+        parser.add_argument("--days", type=int, default=7, help="Length of the stats range in days")
+
+    def handle(self, *args, **options):
+        station = self.get_station(options["station"])
+        try:
+            day = datetime.strptime(options["date"], "%Y-%m-%d").date() if options["date"] else timezone.localdate()
+        except ValueError:
+            raise CommandError("--date must be formatted as YYYY-MM-DD")
+        start = timezone.make_aware(datetime.combine(day - timedelta(days=options["days"]), time.min))
+        end = timezone.make_aware(datetime.combine(day, time.max))
+
+        day_filter = MeasurementFilter(
+            {"station": station.pk, "timestamp_date": day.isoformat()}, queryset=Measurement.objects.all()
+        )
+        range_filter = MeasurementFilter(
+            {"station": station.pk, "timestamp__gt": start.isoformat(), "timestamp__lt": end.isoformat()},
+            queryset=Measurement.objects.all(),
+        )
+        queries = {
+            "latest_measurement": Measurement.objects.filter(station=station).order_by("-timestamp")[:1],
+            "filter_timestamp_date": day_filter.qs,
+            "bulk_delete": range_filter.qs.only("pk"),
+            "stats": daily_stats(station, start.date(), day),
+        }
+        for name, queryset in queries.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain(analyze=True, buffers=True))
+            self.stdout.write("")
+
+    def get_station(self, station_id):
+        if station_id is not None:
+            try:
+                return Station.objects.get(pk=station_id)
+            except Station.DoesNotExist:
+                raise CommandError(f"Station {station_id} not found")
+        latest = Measurement.objects.order_by("-timestamp").select_related("station").first()
+        if latest is None:
+            raise CommandError("There are no measurements to explain against")
+        return latest.station
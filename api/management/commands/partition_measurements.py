@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.partitions import is_partitioned, partition_measurements, unpartition_measurements
+
+
+class Command(BaseCommand):
+    help = "Convert the measurement table to monthly range partitions, or back to a plain table with --revert"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months-ahead", type=int, default=3, help="How many months after the current one to prepare")
+        parser.add_argument("--revert", action="store_true", help="Rebuild a partitioned table as a plain table")
+
+    def handle(self, *args, **options):
+        if options["revert"]:
+            if not is_partitioned():
+                raise CommandError("The measurement table is not partitioned")
+            unpartition_measurements()
+            self.stdout.write(self.style.SUCCESS("Measurement table is no longer partitioned"))
+            return
+        if is_partitioned():
+            raise CommandError("The measurement table is already partitioned")
+        partition_measurements(options["months_ahead"])
+        self.stdout.write(self.style.SUCCESS("Measurement table partitioned by month"))
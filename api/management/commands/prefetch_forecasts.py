@@ -0,0 +1,65 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from api.forecasts import RateLimiter, cell_center, fetch_forecast, forecast_cache_key, stale_cells, station_cells
+from api.meteoblue import MeteoblueError
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Refresh the Meteoblue forecast for every distinct station grid cell ahead of user requests"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Concurrent upstream requests")
+        parser.add_argument("--rate", type=float, default=5, help="Maximum upstream requests per second")
+        parser.add_argument("--max-age", type=float, default=6, help="Refresh forecasts older than this many hours")
+        parser.add_argument("--loop", action="store_true", help="Keep running, one pass every --interval seconds")
+        parser.add_argument("--interval", type=int, default=3600, help="Seconds between passes with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            # Outside a request nothing else expires the persistent connection between passes
+            close_old_connections()
+            if not options["loop"]:
+                self.prefetch(options)
+                break
+            try:
+                self.prefetch(options)
+            except Exception:
+                # e.g. the database is unreachable while listing cells; try again next pass
+                logger.exception("Forecast prefetch pass failed")
+            time.sleep(options["interval"])
+
+    def prefetch(self, options):
+        cells = station_cells()
+        stale = stale_cells(cells, timedelta(hours=options["max_age"]))
+        throttle = RateLimiter(options["rate"])
+        failed = 0
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            futures = {executor.submit(self.refresh, cell, station_ids, throttle): cell
+                       for cell, station_ids in stale.items()}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except MeteoblueError as exc:
+                    failed += 1
+                    self.stderr.write(f"Forecast for {cell_center(futures[future])} failed: {exc}")
+                except Exception:
+                    # A bad payload or a database error only costs this cell, not the pass or the --loop
+                    failed += 1
+                    logger.exception("Forecast for %s failed", cell_center(futures[future]))
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(stale) - failed} forecasts refreshed, {failed} failed, {len(cells) - len(stale)} still fresh"
+        ))
+
+    def refresh(self, cell, station_ids, throttle):
+        try:
+            fetch_forecast(*cell_center(cell), throttle=throttle)
+            cache.delete_many([forecast_cache_key(station_id) for station_id in station_ids])
+        finally:
+            connection.close()
@@ -0,0 +1,23 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from api.rollups import day_start, rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Backfill or rebuild the hourly, daily and monthly rollups from raw measurements"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--station", type=int, action="append", dest="stations", help="Only rebuild this station (repeatable)")
+        parser.add_argument("--since", help="Only rebuild days from this date on, YYYY-MM-DD")
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = day_start(datetime.strptime(options["since"], "%Y-%m-%d").date())
+            except ValueError:
+                raise CommandError("--since must be formatted as YYYY-MM-DD")
+        with transaction.atomic():
+            upserted, deleted = rebuild_stats(options["stations"], since)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {upserted} rollup rows, removed {deleted} stale rows"))
@@ -0,0 +1,114 @@
+import threading
+import time
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .instrumentation import timed
+from .metrics import inc, observe
+
+FORECAST_URL = "https://my.meteoblue.com/packages/basic-day"
+SEARCH_URL = "https://www.meteoblue.com/en/server/search/query3"
+# Endpoint label of each URL in the metrics
+ENDPOINTS = {FORECAST_URL: "forecast", SEARCH_URL: "search"}
+# (connect, read) timeouts in seconds
+TIMEOUT = (3.05, 10)
+
+
+class MeteoblueError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"Meteoblue request failed with status {status_code}")
+        self.status_code = status_code
+
+
+def build_session():
+    # One pooled, keep-alive session per process instead of a new connection per call
+    session = requests.Session()
+    retry = Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry))
+    return session
+
+
+session = build_session()
+
+
+def get(url, params):
+    endpoint = ENDPOINTS[url]
+    started = time.perf_counter()
+    try:
+        with timed("meteoblue_ms"):
+            response = session.get(url, params={**params, "apikey": settings.METEOBLUE_API_KEY}, timeout=TIMEOUT)
+    except requests.Timeout:
+        inc("meteoblue_errors", [endpoint, "timeout"])
+        raise MeteoblueError(504)
+    except requests.RequestException:
+        inc("meteoblue_errors", [endpoint, "connection"])
+        raise MeteoblueError(502)
+    finally:
+        observe("meteoblue_request_duration_seconds", [endpoint], time.perf_counter() - started)
+    if response.status_code != 200:
+        inc("meteoblue_errors", [endpoint, "status"])
+        raise MeteoblueError(response.status_code)
+    return response.json()
+
+
+class SingleFlight:
+    """Runs concurrent calls for the same key once and hands every caller the same result."""
+
+    class Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = self.Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result
+
+
+def fetch_basic_day(lat, lon):
+    return get(FORECAST_URL, {"lat": lat, "lon": lon})
+
+
+def convert_to_dms(lat, lon):
+        lat_deg = int(lat)
+        lat_min = int((abs(lat) - abs(lat_deg)) * 60)
+        lat_sec = (abs(lat) - abs(lat_deg) - lat_min / 60) * 3600
+        lat_direction = "N" if lat >= 0 else "S"
+        lon_deg = int(lon)
+        lon_min = int((abs(lon) - abs(lon_deg)) * 60)
+        lon_sec = (abs(lon) - abs(lon_deg) - lon_min / 60) * 3600
+        lon_direction = "E" if lon >= 0 else "W"
+        return f"{abs(lat_deg)}°{lat_min}'{lat_sec:.1f}\"{lat_direction} {abs(lon_deg)}°{lon_min}'{lon_sec:.1f}\"{lon_direction}"
+
+
+def search_city_name(lat, lon):
+    """Name of the place nearest to the coordinates; raises MeteoblueError if the search fails."""
+    data = get(SEARCH_URL, {"query": convert_to_dms(lat, lon)})
+    results = data.get("results", [])
+    if results:
+        return results[0].get("name", "")
+    else:
+        return ""
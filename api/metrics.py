@@ -0,0 +1,249 @@
+import os
+import socket
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from .cache import cache_stats, increment
+
+PREFIX = "ms_api"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Upper bounds in seconds, shared by every latency histogram
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+VIEWSET_ACTIONS = ("list", "create", "retrieve", "update", "partial_update", "destroy")
+METEOBLUE_ENDPOINTS = ("forecast", "search")
+METEOBLUE_ERRORS = ("timeout", "connection", "status")
+# psycopg_pool counter -> (metric name, help); reset by pop_stats(), so deltas can be summed
+POOL_COUNTERS = {
+    "connections_num": ("db_pool_connections", "Connections opened by the connection pools."),
+    "connections_errors": ("db_pool_connection_errors", "Failed connection attempts of the connection pools."),
+    "connections_lost": ("db_pool_connections_lost", "Pooled connections found broken."),
+    "requests_num": ("db_pool_requests", "Connections requested from the pools."),
+    "requests_queued": ("db_pool_requests_queued", "Connection requests that had to wait for a free connection."),
+    "requests_errors": ("db_pool_request_errors", "Connection requests that timed out."),
+    "requests_wait_ms": ("db_pool_wait_seconds", "Time spent waiting for a free pooled connection."),
+}
+# psycopg_pool gauge -> (metric name, help); each worker reports its own pools and a scrape sums them
+POOL_GAUGES = {
+    "pool_size": ("db_pool_size", "Connections held by the connection pools, busy or idle."),
+    "pool_available": ("db_pool_available", "Idle connections ready in the connection pools."),
+    "requests_waiting": ("db_pool_requests_waiting", "Requests waiting for a free pooled connection."),
+}
+# How often each worker folds its pool counters into the shared ones
+POOL_FLUSH_INTERVAL = 10
+# Gauges of a worker that has not flushed for this long (it exited or sat idle) drop out of the sums
+POOL_GAUGE_TIMEOUT = 6 * POOL_FLUSH_INTERVAL
+POOL_WORKERS_KEY = "metrics_db_pool_workers"
+pool_flush = threading.Lock()
+last_pool_flush = 0
+
+
+# Counters live in the cache like the cache_stats() counters; ApiConfig.ready() requires
+# a Redis CACHE_URL, whose INCRBY is atomic, so they are summed over all workers
+def metric_key(name, labels, suffix="total"):
+    return "_".join(["metrics", name, *labels, suffix])
+
+
+def inc(name, labels=(), amount=1):
+    if settings.METRICS_ENABLED:
+        increment(metric_key(name, labels), amount)
+
+
+def observe(name, labels, seconds):
+    """Add a latency to a histogram: one non-cumulative bucket counter and the sum in microseconds."""
+    if not settings.METRICS_ENABLED:
+        return
+    bucket = next((str(bound) for bound in LATENCY_BUCKETS if seconds <= bound), "inf")
+    increment(metric_key(name, labels, bucket))
+    increment(metric_key(name, labels, "sum"), round(seconds * 1_000_000))
+
+
+def count_connection(sender, connection, **kwargs):
+    # connection_created receiver, connected in ApiConfig.ready(); with a pool it fires per checkout
+    inc("db_connections_opened", [connection.alias])
+
+
+def pooled_aliases():
+    return [alias for alias in settings.DATABASES if settings.DATABASES[alias].get("OPTIONS", {}).get("pool")]
+
+
+def flush_pool_stats():
+    """Add the pool counters gathered by this worker since the last flush to the shared metrics.
+
+    Runs at most once per POOL_FLUSH_INTERVAL per process, so requests only pay
+    for the cache increments every few seconds.
+    """
+    global last_pool_flush
+    if time.monotonic() - last_pool_flush < POOL_FLUSH_INTERVAL or not pool_flush.acquire(blocking=False):
+        return
+    try:
+        last_pool_flush = time.monotonic()
+        gauges = {}
+        for alias in pooled_aliases():
+            pool = connections[alias].pool
+            stats = pool.pop_stats() if pool is not None else {}
+            for stat in POOL_COUNTERS:
+                if stats.get(stat):
+                    inc(f"db_pool_{stat}", [alias], stats[stat])
+            gauges[alias] = {stat: stats.get(stat, 0) for stat in POOL_GAUGES}
+        if gauges:
+            report_pool_gauges(gauges)
+    finally:
+        pool_flush.release()
+
+
+def worker_id():
+    # Process ids repeat across machines
+    return f"{socket.gethostname()}_{os.getpid()}"
+
+
+def pool_gauges_key(worker):
+    return f"metrics_db_pool_gauges_{worker}"
+
+
+def report_pool_gauges(gauges):
+    worker = worker_id()
+    cache.set(pool_gauges_key(worker), gauges, timeout=POOL_GAUGE_TIMEOUT)
+    # Not atomic, but a worker lost from the list by a concurrent write adds itself again on its next flush
+    workers = cache.get(POOL_WORKERS_KEY, [])
+    if worker not in workers:
+        cache.set(POOL_WORKERS_KEY, [*workers, worker], timeout=None)
+
+
+def pool_gauges():
+    """Latest pool gauges of every live worker, as {worker: {alias: {stat: value}}}."""
+    workers = cache.get(POOL_WORKERS_KEY, [])
+    reports = cache.get_many([pool_gauges_key(worker) for worker in workers])
+    live = {worker: reports[pool_gauges_key(worker)] for worker in workers if pool_gauges_key(worker) in reports}
+    if len(live) < len(workers):
+        cache.set(POOL_WORKERS_KEY, list(live), timeout=None)
+    return live
+
+
+def request_series():
+    """(view, action) of every routed API action, so idle actions are reported as zero."""
+    # Imported here because the URLconf imports the views, which import this module
+    from .urls import router
+
+    series = []
+    for _, viewset, _ in router.registry:
+        actions = [action for action in VIEWSET_ACTIONS if hasattr(viewset, action)]
+        actions += [extra.__name__ for extra in viewset.get_extra_actions()]
+        series += [(viewset.__name__, action) for action in actions]
+    return series
+
+
+def format_labels(names, values):
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+
+
+def sample(name, label_text, value):
+    return f"{PREFIX}_{name}{{{label_text}}} {value}" if label_text else f"{PREFIX}_{name} {value}"
+
+
+def header(name, help_text, kind):
+    return [f"# HELP {PREFIX}_{name} {help_text}", f"# TYPE {PREFIX}_{name} {kind}"]
+
+
+def counter_lines(name, help_text, label_names, series, values):
+    lines = header(f"{name}_total", help_text, "counter")
+    for labels in series:
+        lines.append(sample(f"{name}_total", format_labels(label_names, labels), values.get(metric_key(name, labels), 0)))
+    return lines
+
+
+def histogram_keys(name, series):
+    suffixes = [str(bound) for bound in LATENCY_BUCKETS] + ["inf", "sum"]
+    return [metric_key(name, labels, suffix) for labels in series for suffix in suffixes]
+
+
+def histogram_lines(name, help_text, label_names, series, values):
+    lines = header(name, help_text, "histogram")
+    for labels in series:
+        label_text = format_labels(label_names, labels)
+        separator = "," if label_text else ""
+        total = 0
+        for bound in [*LATENCY_BUCKETS, "inf"]:
+            total += values.get(metric_key(name, labels, str(bound)), 0)
+            le = "+Inf" if bound == "inf" else bound
+            lines.append(f'{PREFIX}_{name}_bucket{{{label_text}{separator}le="{le}"}} {total}')
+        seconds = values.get(metric_key(name, labels, "sum"), 0) / 1_000_000
+        lines.append(sample(f"{name}_sum", label_text, seconds))
+        lines.append(sample(f"{name}_count", label_text, total))
+    return lines
+
+
+def database_connections():
+    """Server-side connections of this database by state, counting every worker and machine."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT COALESCE(state, 'unknown'), COUNT(*) FROM pg_stat_activity
+            WHERE datname = current_database() AND backend_type = 'client backend'
+            GROUP BY 1
+            """
+        )
+        states = dict(cursor.fetchall())
+        cursor.execute("SELECT current_setting('max_connections')::int")
+        max_connections = cursor.fetchone()[0]
+    return states, max_connections
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format."""
+    requests = request_series()
+    meteoblue = [(endpoint,) for endpoint in METEOBLUE_ENDPOINTS]
+    meteoblue_errors = [(endpoint, reason) for endpoint in METEOBLUE_ENDPOINTS for reason in METEOBLUE_ERRORS]
+    aliases = [(alias,) for alias in settings.DATABASES]
+    pools = [(alias,) for alias in pooled_aliases()]
+    keys = [
+        *histogram_keys("request_duration_seconds", requests),
+        *histogram_keys("meteoblue_request_duration_seconds", meteoblue),
+        metric_key("measurements_ingested", ()),
+        *[metric_key("meteoblue_errors", labels) for labels in meteoblue_errors],
+        *[metric_key("db_connections_opened", labels) for labels in aliases],
+        *[metric_key(f"db_pool_{stat}", labels) for stat in POOL_COUNTERS for labels in pools],
+    ]
+    values = cache.get_many(keys)
+
+    lines = histogram_lines(
+        "request_duration_seconds", "Latency of API requests per viewset action.",
+        ["view", "action"], requests, values,
+    )
+    lines += counter_lines(
+        "measurements_ingested", "Measurements committed by all write endpoints.", [], [()], values,
+    )
+    lines += header("cache_requests_total", "Lookups of the named response caches by outcome.", "counter")
+    for name, outcomes in cache_stats().items():
+        for outcome, total in outcomes.items():
+            lines.append(f'{PREFIX}_cache_requests_total{{cache="{name}",outcome="{outcome}"}} {total}')
+    lines += histogram_lines(
+        "meteoblue_request_duration_seconds", "Latency of Meteoblue API calls, including retries.",
+        ["endpoint"], meteoblue, values,
+    )
+    lines += counter_lines(
+        "meteoblue_errors", "Failed Meteoblue API calls by reason.", ["endpoint", "reason"], meteoblue_errors, values,
+    )
+    lines += counter_lines(
+        "db_connections_opened", "Database connections opened (or taken from the pool) by the API workers.", ["alias"], aliases, values,
+    )
+    if pools:
+        for stat, (name, help_text) in POOL_COUNTERS.items():
+            lines += header(f"{name}_total", help_text, "counter")
+            for labels in pools:
+                value = values.get(metric_key(f"db_pool_{stat}", labels), 0)
+                # Durations are counted in milliseconds and reported in seconds
+                lines.append(sample(f"{name}_total", format_labels(["alias"], labels), value / 1000 if stat.endswith("_ms") else value))
+        reports = pool_gauges().values()
+        for stat, (name, help_text) in POOL_GAUGES.items():
+            lines += header(name, help_text, "gauge")
+            for labels in pools:
+                total = sum(report.get(labels[0], {}).get(stat, 0) for report in reports)
+                lines.append(sample(name, format_labels(["alias"], labels), total))
+    states, max_connections = database_connections()
+    lines += header("db_connections", "Server connections to the database by state.", "gauge")
+    lines += [f'{PREFIX}_db_connections{{state="{state}"}} {total}' for state, total in sorted(states.items())]
+    lines += header("db_max_connections", "The server's max_connections setting.", "gauge")
+    lines.append(sample("db_max_connections", "", max_connections))
+    return "\n".join(lines) + "\n"
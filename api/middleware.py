@@ -0,0 +1,143 @@
+import cProfile
+import json
+import logging
+import os
+import random
+import threading
+import time
+from django.conf import settings
+from django.db import connection
+from .instrumentation import RequestMetrics, current_metrics
+from .metrics import flush_pool_stats, observe
+
+logger = logging.getLogger("api.performance")
+MAX_LOGGED_STATEMENTS = 50
+profiling = threading.Lock()
+
+
+class PerformanceMiddleware:
+    """Per-request SQL, cache, Meteoblue and serializer timings.
+
+    Adds a Server-Timing header and logs one JSON line per request to the
+    ``api.performance`` logger. Requests slower than PERF_SLOW_REQUEST_MS are
+    logged again at warning level with their SQL, and a PERF_PROFILE_SAMPLE_RATE
+    share of requests runs under cProfile, dumped to PERF_PROFILE_DIR when slow.
+    cProfile sees every thread of the process, so only requests that run alone
+    are profiled; use gunicorn --threads 1 while sampling profiles.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        # Set when another request starts while the profiler is on
+        self.overlapped = False
+
+    def __call__(self, request):
+        with self.lock:
+            self.in_flight += 1
+            if profiling.locked():
+                self.overlapped = True
+        metrics = RequestMetrics(capture_sql=True)
+        token = current_metrics.set(metrics)
+        profiler = self.start_profiler()
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(metrics):
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+            if profiler:
+                profiler.disable()
+                with self.lock:
+                    if self.overlapped:
+                        profiler = None
+                profiling.release()
+            with self.lock:
+                self.in_flight -= 1
+        total_ms = (time.perf_counter() - started) * 1000
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={metrics.db_ms:.1f};desc="{metrics.queries} queries"',
+            f'cache;desc="{metrics.cache_hits} hits, {metrics.cache_misses} misses"',
+            f'meteoblue;dur={metrics.meteoblue_ms:.1f};desc="{metrics.meteoblue_calls} calls"',
+            f"serialize;dur={metrics.serialize_ms:.1f}",
+            f"total;dur={total_ms:.1f}",
+        ])
+        match = request.resolver_match
+        entry = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "total_ms": round(total_ms, 1),
+            "db_ms": round(metrics.db_ms, 1),
+            "queries": metrics.queries,
+            "cache_hits": metrics.cache_hits,
+            "cache_misses": metrics.cache_misses,
+            "meteoblue_ms": round(metrics.meteoblue_ms, 1),
+            "serialize_ms": round(metrics.serialize_ms, 1),
+        }
+        logger.info(json.dumps(entry))
+        if total_ms >= settings.PERF_SLOW_REQUEST_MS:
+            if profiler:
+                entry["profile"] = self.dump_profile(profiler, entry)
+            entry["sql"] = [
+                {"ms": ms, "sql": sql} for ms, sql in metrics.statements[:MAX_LOGGED_STATEMENTS]
+            ]
+            logger.warning("Slow request %s", json.dumps(entry))
+        return response
+
+    def process_template_response(self, request, response):
+        # Runs right before the response is rendered, so the configured renderer is timed as it is
+        metrics = current_metrics.get()
+        started = time.perf_counter()
+
+        def rendered(response):
+            metrics.serialize_ms += (time.perf_counter() - started) * 1000
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def start_profiler(self):
+        if random.random() >= settings.PERF_PROFILE_SAMPLE_RATE:
+            return None
+        with self.lock:
+            # Only one profiler can be active per process, and it would also record other requests' threads
+            if self.in_flight > 1 or not profiling.acquire(blocking=False):
+                return None
+            self.overlapped = False
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool is already active
+            profiling.release()
+            return None
+        return profiler
+
+    def dump_profile(self, profiler, entry):
+        os.makedirs(settings.PERF_PROFILE_DIR, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{entry['view'] or 'unresolved'}-{entry['total_ms']:.0f}ms.prof"
+        path = os.path.join(settings.PERF_PROFILE_DIR, name.replace(":", "_").replace("/", "_"))
+        profiler.dump_stats(path)
+        return path
+
+
+class MetricsMiddleware:
+    """Records the latency of every API viewset action for the /metrics endpoint."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        match = request.resolver_match
+        # Router views carry their viewset and the HTTP method -> action mapping
+        view = getattr(match.func, "cls", None) if match else None
+        action = getattr(match.func, "actions", {}).get(request.method.lower()) if view else None
+        if action:
+            observe("request_duration_seconds", [view.__name__, action], time.perf_counter() - started)
+        flush_pool_stats()
+        return response
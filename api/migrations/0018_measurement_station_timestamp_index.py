@@ -0,0 +1,20 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:03
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Measurements are the largest table; a concurrent build does not block ingestion
+    atomic = False
+
+    dependencies = [
+        ('api', '0017_remove_measurementstat_pressure'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='measurement',
+            index=models.Index(fields=['station', 'timestamp'], name='measurement_station_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:10
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Measurements are the largest table; a concurrent build does not block ingestion
+    atomic = False
+
+    dependencies = [
+        ('api', '0018_measurement_station_timestamp_index'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='measurement',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['timestamp'], name='measurement_timestamp_brin'),
+        ),
+    ]
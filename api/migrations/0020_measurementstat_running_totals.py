@@ -0,0 +1,51 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_running_totals(apps, schema_editor):
+    # Frozen snapshot of the `manage.py rebuild_stats` backfill as it was when this migration was written
+    schema_editor.execute(
+        """
+        INSERT INTO api_measurementstat
+            (station_id, date, count, temperature_sum, humidity_sum, temperature, humidity, created_at)
+        SELECT station_id, date_trunc('day', timestamp AT TIME ZONE %s) AT TIME ZONE %s,
+               COUNT(*), SUM(temperature), SUM(humidity), AVG(temperature), AVG(humidity), now()
+        FROM api_measurement
+        GROUP BY 1, 2
+        ON CONFLICT (station_id, date) DO UPDATE SET
+            count = EXCLUDED.count,
+            temperature_sum = EXCLUDED.temperature_sum,
+            humidity_sum = EXCLUDED.humidity_sum,
+            temperature = EXCLUDED.temperature,
+            humidity = EXCLUDED.humidity
+        """,
+        [settings.TIME_ZONE, settings.TIME_ZONE],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_measurement_timestamp_brin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='measurementstat',
+            name='count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='measurementstat',
+            name='humidity_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='measurementstat',
+            name='temperature_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(backfill_running_totals, migrations.RunPython.noop),
+    ]
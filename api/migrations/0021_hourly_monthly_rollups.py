@@ -0,0 +1,78 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_measurementstat_running_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='measurementstat',
+            name='humidity_max',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='measurementstat',
+            name='humidity_min',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='measurementstat',
+            name='temperature_max',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='measurementstat',
+            name='temperature_min',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='HourlyMeasurementStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('temperature', models.FloatField(blank=True, null=True)),
+                ('humidity', models.FloatField(blank=True, null=True)),
+                ('count', models.IntegerField(default=0)),
+                ('temperature_sum', models.FloatField(default=0)),
+                ('humidity_sum', models.FloatField(default=0)),
+                ('temperature_min', models.FloatField(blank=True, null=True)),
+                ('temperature_max', models.FloatField(blank=True, null=True)),
+                ('humidity_min', models.FloatField(blank=True, null=True)),
+                ('humidity_max', models.FloatField(blank=True, null=True)),
+                ('date', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.station')),
+            ],
+            options={
+                'abstract': False,
+                'unique_together': {('station', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlyMeasurementStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('temperature', models.FloatField(blank=True, null=True)),
+                ('humidity', models.FloatField(blank=True, null=True)),
+                ('count', models.IntegerField(default=0)),
+                ('temperature_sum', models.FloatField(default=0)),
+                ('humidity_sum', models.FloatField(default=0)),
+                ('temperature_min', models.FloatField(blank=True, null=True)),
+                ('temperature_max', models.FloatField(blank=True, null=True)),
+                ('humidity_min', models.FloatField(blank=True, null=True)),
+                ('humidity_max', models.FloatField(blank=True, null=True)),
+                ('date', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.station')),
+            ],
+            options={
+                'abstract': False,
+                'unique_together': {('station', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:12
+
+from django.conf import settings
+from django.db import migrations
+
+
+def backfill_rollups(apps, schema_editor):
+    # Frozen snapshot of the `manage.py rebuild_stats` backfill as it was when this migration was written
+    for table, unit in (
+        ('api_hourlymeasurementstat', 'hour'),
+        ('api_measurementstat', 'day'),
+        ('api_monthlymeasurementstat', 'month'),
+    ):
+        schema_editor.execute(
+            f"""
+            INSERT INTO {table}
+                (station_id, date, count, temperature_sum, humidity_sum, temperature, humidity,
+                 temperature_min, temperature_max, humidity_min, humidity_max, created_at)
+            SELECT station_id, date_trunc('{unit}', timestamp AT TIME ZONE %s) AT TIME ZONE %s,
+                   COUNT(*), SUM(temperature), SUM(humidity), AVG(temperature), AVG(humidity),
+                   MIN(temperature), MAX(temperature), MIN(humidity), MAX(humidity), now()
+            FROM api_measurement
+            GROUP BY 1, 2
+            ON CONFLICT (station_id, date) DO UPDATE SET
+                count = EXCLUDED.count,
+                temperature_sum = EXCLUDED.temperature_sum,
+                humidity_sum = EXCLUDED.humidity_sum,
+                temperature = EXCLUDED.temperature,
+                humidity = EXCLUDED.humidity,
+                temperature_min = EXCLUDED.temperature_min,
+                temperature_max = EXCLUDED.temperature_max,
+                humidity_min = EXCLUDED.humidity_min,
+                humidity_max = EXCLUDED.humidity_max
+            """,
+            [settings.TIME_ZONE, settings.TIME_ZONE],
+        )
+
+
+class Migration(migrations.Migration):
+    # Separate from 0021 so the new unique constraints exist before the ON CONFLICT backfill
+
+    dependencies = [
+        ('api', '0021_hourly_monthly_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
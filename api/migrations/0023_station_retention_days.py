@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_backfill_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='station',
+            name='retention_days',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.1.2 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+# api.forecasts.GRID_SIZE, inlined so the migration stays frozen
+GRID_SIZE = 0.05
+
+
+def assign_grid_cells(apps, schema_editor):
+    schema_editor.execute(
+        """
+        UPDATE api_forecastdata SET
+            grid_lat = floor(latitude / %s + 0.5),
+            grid_lon = floor(longitude / %s + 0.5)
+        """,
+        [GRID_SIZE, GRID_SIZE],
+    )
+    # Keep only the newest fetch of each cell and model run
+    schema_editor.execute(
+        """
+        DELETE FROM api_forecastdata AS forecast
+        WHERE EXISTS (
+            SELECT 1 FROM api_forecastdata AS newer
+            WHERE newer.grid_lat = forecast.grid_lat
+              AND newer.grid_lon = forecast.grid_lon
+              AND newer.modelrun_utc = forecast.modelrun_utc
+              AND newer.id > forecast.id
+        )
+        """
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_station_retention_days'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecastdata',
+            name='grid_lat',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='forecastdata',
+            name='grid_lon',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.RunPython(assign_grid_cells, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='forecastdata',
+            name='grid_lat',
+            field=models.IntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='forecastdata',
+            name='grid_lon',
+            field=models.IntegerField(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='forecastdata',
+            unique_together={('grid_lat', 'grid_lon', 'modelrun_utc')},
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_forecastdata_grid_cell'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodedLocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grid_lat', models.IntegerField()),
+                ('grid_lon', models.IntegerField()),
+                ('city_name', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('grid_lat', 'grid_lon')},
+            },
+        ),
+    ]
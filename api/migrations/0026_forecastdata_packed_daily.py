@@ -0,0 +1,134 @@
+# Generated by Django 5.1.2 on 2026-10-18 20:10
+
+from django.db import migrations, models
+
+# Element types of the array columns packed into `daily`, for unpacking them on reverse
+SERIES_TYPES = {
+    'time': 'text',
+    'temperature_instant': 'double precision',
+    'precipitation': 'double precision',
+    'predictability': 'double precision',
+    'temperature_mean': 'double precision',
+    'temperature_max': 'double precision',
+    'temperature_min': 'double precision',
+    'felttemperature_mean': 'double precision',
+    'relativehumidity_mean': 'integer',
+    'windspeed_mean': 'double precision',
+    'sealevelpressure_mean': 'integer',
+    'precipitation_hours': 'double precision',
+    'pictocode': 'integer',
+    'winddirection': 'integer',
+    'uvindex': 'integer',
+}
+
+
+def unpack_series(name, element_type):
+    # Integers go through numeric, as forecasts fetched after this migration may store them as 5.0
+    cast = 'numeric::integer' if element_type == 'integer' else element_type
+    return (
+        f"{name} = ARRAY(SELECT value::{cast} FROM jsonb_array_elements_text(daily -> '{name}') "
+        f"WITH ORDINALITY AS series (value, position) ORDER BY position)"
+    )
+
+
+UNPACK_DAILY = 'UPDATE api_forecastdata SET ' + ', '.join(
+    unpack_series(name, element_type) for name, element_type in SERIES_TYPES.items()
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_geocodedlocation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecastdata',
+            name='daily',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE api_forecastdata SET daily = jsonb_build_object(
+                'time', to_jsonb(time),
+                'temperature_instant', to_jsonb(temperature_instant),
+                'precipitation', to_jsonb(precipitation),
+                'predictability', to_jsonb(predictability),
+                'temperature_mean', to_jsonb(temperature_mean),
+                'temperature_max', to_jsonb(temperature_max),
+                'temperature_min', to_jsonb(temperature_min),
+                'felttemperature_mean', to_jsonb(felttemperature_mean),
+                'relativehumidity_mean', to_jsonb(relativehumidity_mean),
+                'windspeed_mean', to_jsonb(windspeed_mean),
+                'sealevelpressure_mean', to_jsonb(sealevelpressure_mean),
+                'precipitation_hours', to_jsonb(precipitation_hours),
+                'pictocode', to_jsonb(pictocode),
+                'winddirection', to_jsonb(winddirection),
+                'uvindex', to_jsonb(uvindex)
+            )
+            """,
+            # Runs after the reversed RemoveFields have restored the (empty) array columns
+            UNPACK_DAILY,
+        ),
+        migrations.RemoveField(
+            model_name='forecastdata',
+            name='time',
+        ),
+        migrations.RemoveField(
+            model_name='forecastdata',
+            name='temperature_instant',
+        ),
+        migrations.RemoveField(
+            model_name='forecastdata',
+            name='precipitation',
+        ),
+        migrations.RemoveField(
+            model_name='forecastdata',
+            name='predictability',
+        ),
+        migrations.RemoveField(
+            model_name='forecastdata',
+            name='temperature_mean',
+        ),
+        migrations.RemoveField(
+            model_name='forecastdata',
+            name='temperature_max',
+        ),
+        migrations.RemoveField(
+            model_name='forecastdata',
+            name='temperature_min',
+        ),
+        migrations.RemoveField(
+            model_name='forecastdata',
+            name='felttemperature_mean',
+        ),
+        migrations.RemoveField(
+            model_name='forecastdata',
+            name='relativehumidity_mean',
+        ),
+        migrations.RemoveField(
+            model_name='forecastdata',
+            name='windspeed_mean',
+        ),
+        migrations.RemoveField(
+            model_name='forecastdata',
+            name='sealevelpressure_mean',
+        ),
+        migrations.RemoveField(
+            model_name='forecastdata',
+            name='precipitation_hours',
+        ),
+        migrations.RemoveField(
+            model_name='forecastdata',
+            name='pictocode',
+        ),
+        migrations.RemoveField(
+            model_name='forecastdata',
+            name='winddirection',
+        ),
+        migrations.RemoveField(
+            model_name='forecastdata',
+            name='uvindex',
+        ),
+    ]
@@ -1,5 +1,5 @@
+from django.contrib.postgres.indexes import BrinIndex
 from django.db import models
-from django.contrib.postgres.fields import ArrayField
 from django.contrib.auth.models import User
 from django.utils.timezone import now
 
@@ -9,6 +9,8 @@ class Station(models.Model):
     longitude = models.FloatField()
     city_name = models.TextField()
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Raw measurements older than this are removed by `manage.py apply_retention`; null keeps them forever
+    retention_days = models.PositiveIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -21,6 +23,13 @@ class Measurement(models.Model):
     humidity = models.FloatField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["station", "timestamp"], name="measurement_station_ts_idx"),
+            # Rows arrive roughly in timestamp order, so a BRIN index stays tiny
+            BrinIndex(fields=["timestamp"], name="measurement_timestamp_brin"),
+        ]
+
     def __str__(self):
         return f"Measured {self.temperature} at {self.created_at}"
 
@@ -31,35 +40,59 @@ class ForecastData(models.Model):
     modelrun_utc = models.DateTimeField()
     utc_timeoffset = models.FloatField()
     generation_time_ms = models.FloatField()
-    time = ArrayField(models.TextField(), default=list)
-    temperature_mean = ArrayField(models.FloatField(), default=list)
-    temperature_instant = ArrayField(models.FloatField(), default=list)
-    temperature_max = ArrayField(models.FloatField(), default=list)
-    temperature_min = ArrayField(models.FloatField(), default=list)
-    felttemperature_mean = ArrayField(models.FloatField(), default=list)
-    relativehumidity_mean = ArrayField(models.IntegerField(), default=list)
-    windspeed_mean = ArrayField(models.FloatField(), default=list)
-    sealevelpressure_mean = ArrayField(models.IntegerField(), default=list)
-    precipitation = ArrayField(models.FloatField(), default=list)
-    precipitation_hours = ArrayField(models.FloatField(), default=list)
-    predictability = ArrayField(models.FloatField(), default=list)
-    pictocode = ArrayField(models.IntegerField(), default=list)
-    winddirection = ArrayField(models.IntegerField(), default=list)
-    uvindex = ArrayField(models.IntegerField(), default=list)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Meteoblue's data_day series (time, temperature_mean, ...) packed into one JSONB value
+    daily = models.JSONField(default=dict)
+    # Grid cell the forecast covers (see api.forecasts.grid_cell); nearby stations share one row per model run
+    grid_lat = models.IntegerField()
+    grid_lon = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)  # refreshed when the model run is fetched again
+
+    class Meta:
+        unique_together = (("grid_lat", "grid_lon", "modelrun_utc"),)
 
     def __str__(self):
         return f"Forecast data at {self.created_at}"
 
-class MeasurementStat(models.Model):
+class GeocodedLocation(models.Model):
+    # Coordinates quantized by api.geocoding.geocode_cell
+    grid_lat = models.IntegerField()
+    grid_lon = models.IntegerField()
+    city_name = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = (("grid_lat", "grid_lon"),)
+
+    def __str__(self):
+        return self.city_name
+
+class MeasurementRollup(models.Model):
     station = models.ForeignKey('Station', on_delete=models.CASCADE)
     temperature = models.FloatField(null=True, blank=True)
     humidity = models.FloatField(null=True, blank=True)
-    date = models.DateTimeField()  # changed from DateField to DateTimeField
+    # Running totals maintained on every write, so the averages above never need a rescan
+    count = models.IntegerField(default=0)
+    temperature_sum = models.FloatField(default=0)
+    humidity_sum = models.FloatField(default=0)
+    temperature_min = models.FloatField(null=True, blank=True)
+    temperature_max = models.FloatField(null=True, blank=True)
+    humidity_min = models.FloatField(null=True, blank=True)
+    humidity_max = models.FloatField(null=True, blank=True)
+    date = models.DateTimeField()  # start of the period
     created_at = models.DateTimeField(auto_now_add=True)
-    
+
     class Meta:
+        abstract = True
         unique_together = (("station", "date"),)
 
+class HourlyMeasurementStat(MeasurementRollup):
+    def __str__(self):
+        return f"Hourly stats for {self.station} at {self.date}"
+
+class MeasurementStat(MeasurementRollup):
     def __str__(self):
         return f"Stats for {self.station} on {self.date}"
+
+class MonthlyMeasurementStat(MeasurementRollup):
+    def __str__(self):
+        return f"Monthly stats for {self.station} in {self.date:%Y-%m}"
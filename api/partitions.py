@@ -0,0 +1,248 @@
+import re
+from datetime import datetime, timedelta
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Measurement, Station
+from .rollups import next_period, period_start
+
+PARTITION_NAME_RE = re.compile(r"_p(\d{4})(\d{2})$")
+# Column definitions shared by the plain and the partitioned measurement table
+MEASUREMENT_COLUMNS = """
+    id bigint GENERATED BY DEFAULT AS IDENTITY,
+    station_id bigint NOT NULL REFERENCES {station} (id) DEFERRABLE INITIALLY DEFERRED,
+    timestamp timestamp with time zone NOT NULL,
+    temperature double precision NOT NULL,
+    humidity double precision NOT NULL,
+    created_at timestamp with time zone NOT NULL
+"""
+
+
+def measurement_table():
+    return Measurement._meta.db_table
+
+
+def is_partitioned():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [measurement_table()])
+        row = cursor.fetchone()
+    return row is not None and row[0] == "p"
+
+
+def partition_name(start):
+    return f"{measurement_table()}_p{start:%Y%m}"
+
+
+def monthly_partitions():
+    """Return (name, month start) of every monthly partition, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [measurement_table()],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME_RE.search(name)
+        if match:
+            start = timezone.make_aware(datetime(int(match[1]), int(match[2]), 1))
+            partitions.append((name, start))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def default_partition(cursor):
+    cursor.execute(
+        """
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = %s AND pg_get_expr(child.relpartbound, child.oid) = 'DEFAULT'
+        """,
+        [measurement_table()],
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def create_partition(cursor, start):
+    """Create the partition for the month at ``start``.
+
+    PostgreSQL refuses to add a range the DEFAULT partition holds rows for, so
+    those rows are moved out first and routed into the new partition afterwards.
+    """
+    table = measurement_table()
+    end = next_period(start, "month")
+    default = default_partition(cursor)
+    with transaction.atomic():
+        if default:
+            cursor.execute(f"CREATE TEMPORARY TABLE moved_measurements (LIKE {table})")
+            cursor.execute(
+                f"""
+                WITH moved AS (DELETE FROM {default} WHERE timestamp >= %s AND timestamp < %s RETURNING *)
+                INSERT INTO moved_measurements SELECT * FROM moved
+                """,
+                [start, end],
+            )
+        cursor.execute(
+            f"CREATE TABLE {partition_name(start)} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)", [start, end]
+        )
+        if default:
+            cursor.execute(f"INSERT INTO {table} SELECT * FROM moved_measurements")
+            cursor.execute("DROP TABLE moved_measurements")
+
+
+def create_partitions(months_ahead=3):
+    """Create the partitions for the current month and the next ``months_ahead`` months.
+
+    Returns the names of the partitions that did not exist yet.
+    """
+    existing = {name for name, _ in monthly_partitions()}
+    created = []
+    start = period_start(timezone.now(), "month")
+    with connection.cursor() as cursor:
+        for _ in range(months_ahead + 1):
+            name = partition_name(start)
+            if name not in existing:
+                create_partition(cursor, start)
+                created.append(name)
+            start = next_period(start, "month")
+    return created
+
+
+def replace_table(cursor, name):
+    """Copy every measurement into the new table ``name`` and swap it in, keeping the indexes and id sequence."""
+    table = measurement_table()
+    cursor.execute("SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname != %s", [table, f"{table}_pkey"])
+    # Indexes of a partitioned table are defined ON ONLY the parent
+    indexes = [row[0].replace(" ON ONLY ", " ON ") for row in cursor.fetchall()]
+    cursor.execute(
+        f"""
+        INSERT INTO {name} (id, station_id, timestamp, temperature, humidity, created_at)
+        SELECT id, station_id, timestamp, temperature, humidity, created_at FROM {table}
+        """
+    )
+    # Fire the deferred foreign key checks now; pending trigger events would block CREATE INDEX below
+    cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {name} RENAME TO {table}")
+    cursor.execute(f"ALTER INDEX {name}_pkey RENAME TO {table}_pkey")
+    for index in indexes:
+        cursor.execute(index)
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+    )
+
+
+def partition_measurements(months_ahead=3):
+    """Rebuild the measurement table as monthly range partitions on timestamp.
+
+    Every month from the oldest row to ``months_ahead`` months from now gets its
+    own partition; later rows land in a DEFAULT partition. Django keeps treating
+    ``id`` as the primary key; in the database it becomes (id, timestamp) because
+    PostgreSQL requires the partition key in it. The table is locked while its
+    rows are copied.
+    """
+    table = measurement_table()
+    name = f"{table}_partitioned"
+    columns = MEASUREMENT_COLUMNS.format(station=Station._meta.db_table)
+    now = timezone.now()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"SELECT MIN(timestamp) FROM {table}")
+        first = cursor.fetchone()[0]
+        start = period_start(min(first or now, now), "month")
+        end = period_start(now, "month")
+        for _ in range(months_ahead + 1):
+            end = next_period(end, "month")
+        cursor.execute(f"CREATE TABLE {name} ({columns}, PRIMARY KEY (id, timestamp)) PARTITION BY RANGE (timestamp)")
+        while start < end:
+            cursor.execute(
+                f"CREATE TABLE {partition_name(start)} PARTITION OF {name} FOR VALUES FROM (%s) TO (%s)",
+                [start, next_period(start, "month")],
+            )
+            start = next_period(start, "month")
+        cursor.execute(f"CREATE TABLE {table}_default PARTITION OF {name} DEFAULT")
+        replace_table(cursor, name)
+
+
+def unpartition_measurements():
+    """Rebuild a partitioned measurement table as a plain table with ``id`` as its primary key.
+
+    Partitions detached by ``apply_retention --archive`` are separate tables and stay as they are.
+    """
+    table = measurement_table()
+    name = f"{table}_plain"
+    columns = MEASUREMENT_COLUMNS.format(station=Station._meta.db_table)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"CREATE TABLE {name} ({columns}, PRIMARY KEY (id))")
+        replace_table(cursor, name)
+
+
+def expired_partitions(policies, now=None):
+    """Partitions whose every station has a retention policy that has expired the whole month."""
+    now = now or timezone.now()
+    expired = []
+    for name, start in monthly_partitions():
+        end = next_period(start, "month")
+        if end > now - timedelta(days=min(policies.values(), default=0)):
+            break
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT DISTINCT station_id FROM {name}")
+            station_ids = [row[0] for row in cursor.fetchall()]
+        if station_ids and all(
+            station_id in policies and end <= now - timedelta(days=policies[station_id])
+            for station_id in station_ids
+        ):
+            expired.append(name)
+    return expired
+
+
+def apply_retention(archive=False, dry_run=False):
+    """Enforce Station.retention_days on raw measurements.
+
+    Months that are expired for every station in them are dropped (or detached
+    with ``archive``) as whole partitions; the remaining expired rows are removed
+    with one set-based DELETE per station. Rollup tiers are left untouched, so
+    aggregated history outlives the raw data. Returns the removed partitions and
+    the number of deleted rows.
+    """
+    policies = dict(Station.objects.filter(retention_days__isnull=False).values_list("pk", "retention_days"))
+    if not policies:
+        return [], 0
+    now = timezone.now()
+    partitions = expired_partitions(policies, now) if is_partitioned() else []
+    deleted = 0
+    with connection.cursor() as cursor:
+        for name in partitions:
+            if dry_run:
+                continue
+            if archive:
+                cursor.execute(f"ALTER TABLE {measurement_table()} DETACH PARTITION {name}")
+                # The archived table keeps the station foreign key, which would block deleting stations
+                cursor.execute(
+                    "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'", [name]
+                )
+                for (constraint,) in cursor.fetchall():
+                    cursor.execute(f'ALTER TABLE {name} DROP CONSTRAINT "{constraint}"')
+            else:
+                cursor.execute(f"DROP TABLE {name}")
+        for station_id, days in policies.items():
+            cutoff = now - timedelta(days=days)
+            if dry_run:
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM {measurement_table()} WHERE station_id = %s AND timestamp < %s",
+                    [station_id, cutoff],
+                )
+                deleted += cursor.fetchone()[0]
+            else:
+                cursor.execute(
+                    f"DELETE FROM {measurement_table()} WHERE station_id = %s AND timestamp < %s",
+                    [station_id, cutoff],
+                )
+                deleted += cursor.rowcount
+    return partitions, deleted
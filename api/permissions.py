@@ -5,5 +5,6 @@ class IsOwner(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             # Allow read-only methods for everyone
             return True
-        # Check if the user making the request is the owner of the student object
-        return obj.user == request.user
+        # Check if the user making the request is the owner of the object (measurements through their station)
+        owner_id = obj.station.user_id if hasattr(obj, 'station') else obj.user_id
+        return owner_id == request.user.pk
@@ -0,0 +1,42 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+from .instrumentation import timed
+
+try:
+    import orjson
+except ImportError:
+    # Optional `fast-json` extra; settings refuse FAST_JSON without it
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by orjson when FAST_JSON is set."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not settings.FAST_JSON or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Types orjson does not know (Decimal, lazy strings, ...) go through DRF's encoder
+        return orjson.dumps(data, default=JSONEncoder().default)
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser backed by orjson when FAST_JSON is set."""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if not settings.FAST_JSON:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+def render_json(data):
+    """Encode data the way the configured API renderer would, for responses cached as bytes."""
+    with timed("serialize_ms"):
+        return FastJSONRenderer().render(data)
@@ -0,0 +1,207 @@
+from datetime import datetime, time, timedelta
+from functools import partial
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .metrics import inc
+from .models import HourlyMeasurementStat, Measurement, MeasurementStat, MonthlyMeasurementStat, Station
+
+# Rollup tiers from finest to coarsest, keyed by their date_trunc() unit
+TIERS = {
+    "hour": HourlyMeasurementStat,
+    "day": MeasurementStat,
+    "month": MonthlyMeasurementStat,
+}
+TOTAL_COLUMNS = [
+    "count", "temperature_sum", "humidity_sum",
+    "temperature_min", "temperature_max", "humidity_min", "humidity_max",
+]
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def period_start(value, unit):
+    """Truncate an aware datetime to the start of its hour, day or month in the current timezone."""
+    local = timezone.localtime(value).replace(tzinfo=None, minute=0, second=0, microsecond=0)
+    if unit in ("day", "month"):
+        local = local.replace(hour=0)
+    if unit == "month":
+        local = local.replace(day=1)
+    return timezone.make_aware(local)
+
+
+def next_period(start, unit):
+    local = timezone.localtime(start).replace(tzinfo=None)
+    if unit == "hour":
+        local += timedelta(hours=1)
+    elif unit == "day":
+        local += timedelta(days=1)
+    else:
+        local = local.replace(year=local.year + local.month // 12, month=local.month % 12 + 1)
+    return timezone.make_aware(local)
+
+
+def period_totals(measurements, unit):
+    """Group measurements into per station-period totals in TOTAL_COLUMNS order."""
+    totals = {}
+    for measurement in measurements:
+        key = (measurement.station_id, period_start(measurement.timestamp, unit))
+        t, h = measurement.temperature, measurement.humidity
+        total = totals.get(key)
+        if total is None:
+            totals[key] = [1, t, h, t, t, h, h]
+        else:
+            total[0] += 1
+            total[1] += t
+            total[2] += h
+            total[3] = min(total[3], t)
+            total[4] = max(total[4], t)
+            total[5] = min(total[5], h)
+            total[6] = max(total[6], h)
+    return totals
+
+
+def record_measurements(measurements):
+    """Fold newly inserted measurements into every rollup tier, one upsert per tier.
+
+    Call inside the transaction that writes the measurements so the rollups never
+    drift from the data.
+    """
+    if not measurements:
+        return
+    # Every write endpoint passes through here, so this is where ingestion is counted
+    transaction.on_commit(partial(inc, "measurements_ingested", amount=len(measurements)))
+    for unit, model in TIERS.items():
+        table = model._meta.db_table
+        values = []
+        params = []
+        for (station_id, start), total in period_totals(measurements, unit).items():
+            values.append("(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, now())")
+            params += [station_id, start, *total, total[1] / total[0], total[2] / total[0]]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table}
+                    (station_id, date, {", ".join(TOTAL_COLUMNS)}, temperature, humidity, created_at)
+                VALUES {", ".join(values)}
+                ON CONFLICT (station_id, date) DO UPDATE SET
+                    count = {table}.count + EXCLUDED.count,
+                    temperature_sum = {table}.temperature_sum + EXCLUDED.temperature_sum,
+                    humidity_sum = {table}.humidity_sum + EXCLUDED.humidity_sum,
+                    temperature_min = LEAST({table}.temperature_min, EXCLUDED.temperature_min),
+                    temperature_max = GREATEST({table}.temperature_max, EXCLUDED.temperature_max),
+                    humidity_min = LEAST({table}.humidity_min, EXCLUDED.humidity_min),
+                    humidity_max = GREATEST({table}.humidity_max, EXCLUDED.humidity_max),
+                    temperature = ({table}.temperature_sum + EXCLUDED.temperature_sum)
+                        / NULLIF({table}.count + EXCLUDED.count, 0),
+                    humidity = ({table}.humidity_sum + EXCLUDED.humidity_sum)
+                        / NULLIF({table}.count + EXCLUDED.count, 0)
+                """,
+                params,
+            )
+
+
+def rebuild_stats(station_ids=None, since=None, until=None):
+    """Recompute the rollup tiers with set-based SQL.
+
+    Min/max cannot be decremented, so writes that remove or change measurements
+    rebuild the periods around them instead. Hours are rebuilt from raw
+    measurements and every coarser tier from the tier below it, so a single-row
+    write re-reads one hour of raw rows, at most 24 hourly rows and at most 31
+    daily rows. ``since``/``until`` are aware datetimes widened to whole periods
+    of each tier. Returns the number of upserted and deleted rows.
+
+    Retention removes raw rows but keeps their rollups, so hours that start
+    before a station's retention cutoff are left as they are instead of being
+    recomputed from the rows that survived. Coarser tiers fold the kept hours.
+    """
+    tz = settings.TIME_ZONE
+    retained = f"""NOT EXISTS (
+        SELECT 1 FROM {Station._meta.db_table} AS station
+        WHERE station.id = {{alias}}.station_id AND station.retention_days IS NOT NULL
+          AND {{period}} < %s - station.retention_days * interval '1 day'
+    )"""
+    now = timezone.now()
+    source = Measurement._meta.db_table
+    time_column = "timestamp"
+    totals = """COUNT(*), SUM(temperature), SUM(humidity),
+                MIN(temperature), MAX(temperature), MIN(humidity), MAX(humidity),
+                AVG(temperature), AVG(humidity)"""
+    upserted = deleted = 0
+    for unit, model in TIERS.items():
+        table = model._meta.db_table
+        conditions = []
+        params = []
+        if station_ids:
+            conditions.append("station_id = ANY(%s)")
+            params.append(list(station_ids))
+        if since is not None:
+            conditions.append("{column} >= %s")
+            params.append(period_start(since, unit))
+        if until is not None:
+            conditions.append("{column} < %s")
+            params.append(next_period(period_start(until, unit), unit))
+        where = " AND ".join(conditions) or "TRUE"
+        period = f"date_trunc('{unit}', {time_column} AT TIME ZONE %s) AT TIME ZONE %s"
+        source_where, source_params = where.format(column=time_column), params
+        stale_where, stale_params = where.format(column="date"), params
+        if unit == "hour":
+            source_where += f" AND {retained.format(alias=source, period=period)}"
+            source_params = [*params, tz, tz, now]
+            stale_where += f" AND {retained.format(alias='stat', period='stat.date')}"
+            stale_params = [*params, now]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table}
+                    (station_id, date, {", ".join(TOTAL_COLUMNS)}, temperature, humidity, created_at)
+                SELECT station_id, {period}, {totals}, now()
+                FROM {source}
+                WHERE {source_where}
+                GROUP BY 1, 2
+                ON CONFLICT (station_id, date) DO UPDATE SET
+                    {", ".join(f"{column} = EXCLUDED.{column}" for column in TOTAL_COLUMNS)},
+                    temperature = EXCLUDED.temperature,
+                    humidity = EXCLUDED.humidity
+                """,
+                [tz, tz, *source_params],
+            )
+            upserted += cursor.rowcount
+            cursor.execute(
+                f"""
+                DELETE FROM {table} AS stat
+                WHERE {stale_where} AND NOT EXISTS (
+                    SELECT 1 FROM {source} AS source
+                    WHERE source.station_id = stat.station_id
+                      AND source.{time_column} >= stat.date
+                      AND source.{time_column} < stat.date + interval '1 {unit}'
+                )
+                """,
+                stale_params,
+            )
+            deleted += cursor.rowcount
+        # The next tier folds this one's rows instead of scanning raw measurements again
+        source = table
+        time_column = "date"
+        totals = """SUM(count), SUM(temperature_sum), SUM(humidity_sum),
+                    MIN(temperature_min), MAX(temperature_max), MIN(humidity_min), MAX(humidity_max),
+                    SUM(temperature_sum) / NULLIF(SUM(count), 0), SUM(humidity_sum) / NULLIF(SUM(count), 0)"""
+    return upserted, deleted
+
+
+def daily_stats(station, start_date, end_date):
+    """Stored daily rollups for a station, newest first.
+
+    Past days need at least two measurements to be reported; today only needs one.
+    """
+    today = timezone.localdate()
+    return (
+        MeasurementStat.objects.filter(
+            station=station, date__gte=day_start(start_date), date__lte=day_start(end_date)
+        )
+        .filter(Q(count__gte=2) | Q(date=day_start(today), count__gte=1))
+        .order_by("-date")
+    )
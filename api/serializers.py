@@ -1,6 +1,8 @@
 from djoser.serializers import UserSerializer, UserCreateSerializer as BaseUserSerializer
 from django.contrib.auth.models import User
+from django.utils import timezone
 from rest_framework import serializers
+from .instrumentation import timed
 from .models import Measurement, ForecastData, Station, MeasurementStat
 
 class UserCreateSerializer(BaseUserSerializer):
@@ -35,9 +37,78 @@ class MeasurementSerializer(serializers.ModelSerializer):
 class ForecastDataSerializer(serializers.ModelSerializer):
     class Meta:
         model = ForecastData
-        fields = '__all__'
+        exclude = ['grid_lat', 'grid_lon', 'daily']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # The packed daily series are exposed as top-level fields, as when they had their own columns
+        data.update(instance.daily)
+        return data
 
 class MeasurementStatSerializer(serializers.ModelSerializer):
     class Meta:
         model = MeasurementStat
-        fields = '__all__'
+        exclude = ['temperature_sum', 'humidity_sum']
+
+def format_datetime(value):
+    # Same representation DRF's DateTimeField produces
+    value = timezone.localtime(value).isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
+
+class ValuesSerializer:
+    """Read-only twin of a ModelSerializer that renders ``.values()`` rows.
+
+    ``fields`` maps each output key, in the ModelSerializer's order, to its
+    ``values()`` lookup, so reads skip model instances and per-field objects.
+    """
+    fields = {}
+    datetime_fields = ()
+
+    def __init__(self, instance=None, many=False, **kwargs):
+        self.instance = instance
+        self.many = many
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.values(*cls.fields.values())
+
+    def to_representation(self, row):
+        data = {key: row[lookup] for key, lookup in self.fields.items()}
+        for key in self.datetime_fields:
+            if data[key] is not None:
+                data[key] = format_datetime(data[key])
+        return data
+
+    @property
+    def data(self):
+        # Fetch first, so query time is not counted as serialization
+        rows = list(self.instance) if self.many else None
+        with timed("serialize_ms"):
+            if self.many:
+                return [self.to_representation(row) for row in rows]
+            return self.to_representation(self.instance)
+
+class MeasurementValuesSerializer(ValuesSerializer):
+    fields = {
+        "id": "id", "station": "station_id", "timestamp": "timestamp",
+        "temperature": "temperature", "humidity": "humidity", "created_at": "created_at",
+    }
+    datetime_fields = ("timestamp", "created_at")
+
+class StationValuesSerializer(ValuesSerializer):
+    fields = {
+        "id": "id", "user": "user_id", "city_name": "city_name", "name": "name", "latitude": "latitude",
+        "longitude": "longitude", "retention_days": "retention_days", "created_at": "created_at",
+    }
+    datetime_fields = ("created_at",)
+
+class MeasurementStatValuesSerializer(ValuesSerializer):
+    fields = {
+        "id": "id", "temperature": "temperature", "humidity": "humidity", "count": "count",
+        "temperature_min": "temperature_min", "temperature_max": "temperature_max",
+        "humidity_min": "humidity_min", "humidity_max": "humidity_max",
+        "date": "date", "created_at": "created_at", "station": "station_id",
+    }
+    datetime_fields = ("date", "created_at")
@@ -0,0 +1,93 @@
+from django.db.models import Avg, Count, DateTimeField, Func, Max, Min
+from .serializers import format_datetime
+from .models import Measurement
+
+BUCKET_SIZES = {
+    "5m": 5 * 60,
+    "15m": 15 * 60,
+    "1h": 60 * 60,
+    "6h": 6 * 60 * 60,
+    "1d": 24 * 60 * 60,
+}
+MAX_BUCKETS = 5000
+# LTTB needs at least the first, one middle and the last point
+MIN_LTTB_POINTS = 3
+MAX_LTTB_POINTS = 5000
+# Raw rows held in memory by one downsampling request
+MAX_LTTB_ROWS = 100_000
+SERIES_FIELDS = ("temperature", "humidity")
+
+
+class TimeBucket(Func):
+    """Floors a timestamp to a fixed-width bucket aligned to the Unix epoch."""
+    template = "to_timestamp(floor(extract(epoch from %(expressions)s) / %(seconds)d) * %(seconds)d)"
+    output_field = DateTimeField()
+
+    def __init__(self, expression, seconds, **extra):
+        super().__init__(expression, seconds=int(seconds), **extra)
+
+
+def bucket_aggregates(station_id, start, end, seconds):
+    aggregates = {"count": Count("id")}
+    for field in SERIES_FIELDS:
+        aggregates[f"{field}_min"] = Min(field)
+        aggregates[f"{field}_max"] = Max(field)
+        aggregates[f"{field}_avg"] = Avg(field)
+    rows = (
+        Measurement.objects.filter(station_id=station_id, timestamp__gte=start, timestamp__lte=end)
+        .annotate(time=TimeBucket("timestamp", seconds))
+        .values("time")
+        .annotate(**aggregates)
+        .order_by("time")
+    )
+    return [{**row, "time": format_datetime(row["time"])} for row in rows]
+
+
+def lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets downsampling to at most ``threshold`` points.
+
+    Points are tuples whose first two items are x and y; extra items are carried along.
+    """
+    if threshold >= len(points) or threshold < 3:
+        return points
+    sampled = [points[0]]
+    every = (len(points) - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, len(points))
+        avg_range = points[avg_start:avg_end]
+        avg_x = sum(point[0] for point in avg_range) / len(avg_range)
+        avg_y = sum(point[1] for point in avg_range) / len(avg_range)
+
+        ax, ay = points[a][0], points[a][1]
+        max_area = -1
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            x, y = points[j][0], points[j][1]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                a = j
+        sampled.append(points[a])
+    sampled.append(points[-1])
+    return sampled
+
+
+def downsampled_series(station_id, start, end, threshold):
+    """LTTB-downsampled series of every field, or None if the range holds more than MAX_LTTB_ROWS rows."""
+    rows = (
+        Measurement.objects.filter(station_id=station_id, timestamp__gte=start, timestamp__lte=end)
+        .order_by("timestamp")
+        .values_list("timestamp", *SERIES_FIELDS)
+    )[:MAX_LTTB_ROWS + 1]
+    columns = {field: [] for field in SERIES_FIELDS}
+    for index, (timestamp, *values) in enumerate(rows.iterator()):
+        if index == MAX_LTTB_ROWS:
+            return None
+        x = timestamp.timestamp()
+        for field, value in zip(SERIES_FIELDS, values):
+            columns[field].append((x, value, timestamp))
+    return {
+        field: [{"time": format_datetime(timestamp), "value": y} for _, y, timestamp in lttb(points, threshold)]
+        for field, points in columns.items()
+    }
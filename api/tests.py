@@ -1,3 +1,371 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import urlencode
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Avg, Count, Max, Min, Sum
+from django.db.models.functions import Trunc
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from .benchmark import METEOBLUE_STUB, forget_station
+from .models import ForecastData, Measurement, Station
+from .partitions import apply_retention, create_partitions, is_partitioned, partition_measurements, unpartition_measurements
+from .rollups import TIERS, rebuild_stats
 
-# Create your tests here.
+
+def authenticated_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"JWT {AccessToken.for_user(user)}")
+    return client
+
+
+class APITestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="secret-password")
+        self.station = Station.objects.create(name="station", latitude=48.1, longitude=17.1, city_name="X", user=self.user)
+        self.client = authenticated_client(self.user)
+
+
+class IngestTests(APITestCase):
+    def ingest(self, body, content_type):
+        return self.client.generic("POST", "/api/measurements/ingest/", body, content_type=content_type)
+
+    def test_invalid_utf8_ndjson_line_is_rejected(self):
+        body = (
+            f'{{"station": {self.station.pk}, "temperature": 1, "humidity": 2}}\n'.encode()
+            + b'{"station": 1, "temperature": "\xff"}\n'
+            + f'{{"station": {self.station.pk}, "temperature": 3, "humidity": 4}}\n'.encode()
+        )
+        response = self.ingest(body, "application/x-ndjson")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["inserted"], 2)
+        self.assertEqual(response.json()["rejected"], [{"index": 1, "errors": {"non_field_errors": ["Invalid UTF-8."]}}])
+        self.assertEqual(Measurement.objects.count(), 2)
+
+    def test_invalid_utf8_csv_line_is_rejected(self):
+        body = (
+            b"station,temperature,humidity\n"
+            + f"{self.station.pk},1,2\n".encode()
+            + b"\xff\xfe,1,2\n"
+            + f"{self.station.pk},3,4\n".encode()
+        )
+        response = self.ingest(body, "text/csv")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["inserted"], 2)
+        self.assertEqual(response.json()["rejected"], [{"index": 1, "errors": {"non_field_errors": ["Invalid UTF-8."]}}])
+
+
+class LatestMeasurementTests(APITestCase):
+    def test_not_modified_repeats_validators(self):
+        Measurement.objects.create(station=self.station, temperature=1, humidity=2)
+        response = self.client.get("/api/measurements/latest/", {"station": self.station.pk})
+        cached = self.client.get(
+            "/api/measurements/latest/", {"station": self.station.pk}, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached["ETag"], response["ETag"])
+        self.assertEqual(cached["Last-Modified"], response["Last-Modified"])
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        Measurement.objects.create(station=self.station, temperature=1, humidity=2)
+
+    def test_anonymous_export_requires_station(self):
+        response = APIClient().get("/api/measurements/export/")
+        self.assertEqual(response.status_code, 400)
+
+    def test_anonymous_export_of_one_station(self):
+        response = APIClient().get("/api/measurements/export/", {"station": self.station.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 2)
+
+
+class CursorPaginationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        # Bursts sharing a timestamp must page by id, not by offset
+        timestamps = [timezone.now() - timedelta(minutes=minutes) for minutes in (3, 2, 1)]
+        Measurement.objects.bulk_create(
+            Measurement(station=self.station, timestamp=timestamp, temperature=index, humidity=0)
+            for timestamp in timestamps for index in range(7)
+        )
+        self.expected = list(Measurement.objects.order_by("timestamp", "id").values_list("id", flat=True))
+
+    def walk(self, url, params=None, key="next"):
+        ids = []
+        pages = []
+        while url:
+            body = self.client.get(url, params).json()
+            params = None
+            pages.append([row["id"] for row in body["results"]])
+            ids += pages[-1]
+            url = body[key]
+        return ids, pages
+
+    def test_pages_forward_and_back_through_equal_timestamps(self):
+        ids, pages = self.walk("/api/measurements/", {"pagination": "cursor", "page_size": 4})
+        self.assertEqual(ids, self.expected)
+        self.assertEqual([len(page) for page in pages], [4, 4, 4, 4, 4, 1])
+        last = self.client.get("/api/measurements/", {"pagination": "cursor", "page_size": 4})
+        for _ in range(5):
+            last = self.client.get(last.json()["next"])
+        _, back = self.walk(last.json()["previous"], key="previous")
+        self.assertEqual([id for page in reversed(back) for id in page], self.expected[:20])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get("/api/measurements/", {"cursor": "cD1nYXJiYWdl"})
+        self.assertEqual(response.status_code, 404)
+
+
+class TrustedPageSizeTests(APITestCase):
+    def test_invalid_staff_page_size_falls_back_to_default(self):
+        self.user.is_staff = True
+        self.user.save()
+        Measurement.objects.bulk_create(
+            Measurement(station=self.station, temperature=index, humidity=0) for index in range(15)
+        )
+        for page_size in ("0", "-1", "abc"):
+            response = self.client.get("/api/measurements/", {"page_size": page_size})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()["results"]), 10)
+        response = self.client.get("/api/measurements/", {"page_size": "12"})
+        self.assertEqual(len(response.json()["results"]), 12)
+
+
+class SeriesTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        Measurement.objects.bulk_create(
+            Measurement(station=self.station, timestamp=now - timedelta(minutes=index), temperature=index, humidity=0)
+            for index in range(20)
+        )
+        self.params = {
+            "station": self.station.pk, "mode": "lttb",
+            "timestamp__gt": (now - timedelta(hours=1)).isoformat(), "timestamp__lt": now.isoformat(),
+        }
+
+    def test_points_below_three_are_rejected(self):
+        for points in ("0", "-1", "2", "abc"):
+            response = self.client.get("/api/measurements/series/", {**self.params, "points": points})
+            self.assertEqual(response.status_code, 400, points)
+
+    def test_downsamples_to_points(self):
+        response = self.client.get("/api/measurements/series/", {**self.params, "points": 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["temperature"]), 3)
+
+    def test_range_above_row_cap_is_rejected(self):
+        with mock.patch("api.series.MAX_LTTB_ROWS", 10):
+            response = self.client.get("/api/measurements/series/", {**self.params, "points": 5})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(SHARED_CACHE=True)
+class ResponseCacheTests(APITestCase):
+    def stats(self, station):
+        today = timezone.localdate().isoformat()
+        params = {"station": station, "timestamp__gt": today, "timestamp__lt": today, "resolution": "day"}
+        return self.client.get("/api/measurements/stats/", params)
+
+    def test_writes_invalidate_every_spelling_of_the_station(self):
+        padded = f"0{self.station.pk}"
+        self.assertEqual(self.stats(padded).json()["results"], [])
+        self.client.post("/api/measurements/", {"station": self.station.pk, "temperature": 5, "humidity": 50}, format="json")
+        self.assertEqual([row["count"] for row in self.stats(padded).json()["results"]], [1])
+
+    def test_non_numeric_station_is_not_cached(self):
+        self.assertEqual(self.stats("1.0").status_code, 404)
+
+
+class RollupConsistencyTests(APITestCase):
+    """Every write path must leave each rollup tier equal to aggregates over the raw rows."""
+
+    def setUp(self):
+        super().setUp()
+        # Spans hour, day and month boundaries
+        self.base = timezone.now().replace(day=1, hour=0, minute=30, second=0, microsecond=0) - timedelta(days=40)
+
+    def at(self, hours):
+        return (self.base + timedelta(hours=hours)).isoformat()
+
+    def row(self, hours, temperature, humidity=50):
+        return {"station": self.station.pk, "timestamp": self.at(hours), "temperature": temperature, "humidity": humidity}
+
+    def assertRollupsMatch(self):
+        for unit, model in TIERS.items():
+            expected = {
+                (row.pop("station"), row.pop("period")): row
+                for row in Measurement.objects.annotate(period=Trunc("timestamp", unit))
+                .values("station", "period")
+                .annotate(
+                    count=Count("id"), temperature_sum=Sum("temperature"), humidity_sum=Sum("humidity"),
+                    temperature_min=Min("temperature"), temperature_max=Max("temperature"),
+                    humidity_min=Min("humidity"), humidity_max=Max("humidity"),
+                    temperature=Avg("temperature"), humidity=Avg("humidity"),
+                )
+            }
+            actual = {(stat.station_id, stat.date): stat for stat in model.objects.all()}
+            self.assertEqual(sorted(actual), sorted(expected), unit)
+            for key, totals in expected.items():
+                for column, value in totals.items():
+                    self.assertAlmostEqual(getattr(actual[key], column), value, msg=f"{unit} {column}")
+
+    def test_create_update_delete(self):
+        ids = [self.client.post("/api/measurements/", self.row(hours, hours), format="json").json()["id"]
+               for hours in (0, 1, 1.5, 30, 800)]
+        self.assertRollupsMatch()
+        # Moves a reading into another hour, day and month
+        self.client.patch(f"/api/measurements/{ids[1]}/", {"timestamp": self.at(900), "temperature": -5}, format="json")
+        self.assertRollupsMatch()
+        # Removes the minimum of its hour
+        self.client.patch(f"/api/measurements/{ids[0]}/", {"temperature": 99}, format="json")
+        self.assertRollupsMatch()
+        for pk in ids[2:]:
+            self.client.delete(f"/api/measurements/{pk}/")
+            self.assertRollupsMatch()
+
+    def test_bulk_create_and_bulk_delete(self):
+        self.client.post("/api/measurements/bulk-create/", [self.row(hours, hours) for hours in range(0, 900, 7)], format="json")
+        self.assertRollupsMatch()
+        self.client.post(
+            "/api/measurements/bulk-create/?mode=fast", [self.row(hours, -hours) for hours in range(3, 900, 11)], format="json"
+        )
+        self.assertRollupsMatch()
+        self.client.delete(f"/api/measurements/bulk-delete/?{urlencode({'timestamp__gt': self.at(100), 'timestamp__lt': self.at(500)})}")
+        self.assertRollupsMatch()
+        self.client.delete(f"/api/measurements/bulk-delete/?{urlencode({'station': self.station.pk})}")
+        self.assertRollupsMatch()
+
+    def test_streaming_ingest(self):
+        ndjson = "".join(json.dumps(self.row(hours, hours % 13)) + "\n" for hours in range(0, 900, 5))
+        self.client.generic("POST", "/api/measurements/ingest/", ndjson.encode(), content_type="application/x-ndjson")
+        self.assertRollupsMatch()
+        lines = ["station,timestamp,temperature,humidity"] + [
+            f"{self.station.pk},{self.at(hours)},{hours % 7},{hours % 90}" for hours in range(2, 900, 9)
+        ]
+        self.client.generic("POST", "/api/measurements/ingest/", "\n".join(lines).encode(), content_type="text/csv")
+        self.assertRollupsMatch()
+
+    def test_rebuild_from_scratch(self):
+        self.client.post("/api/measurements/bulk-create/", [self.row(hours, hours) for hours in range(0, 900, 7)], format="json")
+        for model in TIERS.values():
+            model.objects.all().delete()
+        rebuild_stats()
+        self.assertRollupsMatch()
+
+    def test_rebuild_keeps_rollups_of_expired_rows(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {Measurement._meta.db_table} (station_id, timestamp, temperature, humidity, created_at)
+                SELECT %s, ts, extract(hour FROM ts), 50, now()
+                FROM generate_series(%s::timestamptz, now(), interval '1 hour') AS ts
+                """,
+                [self.station.pk, self.base - timedelta(days=50)],
+            )
+        rebuild_stats()
+        before = {unit: list(model.objects.order_by("date").values()) for unit, model in TIERS.items()}
+        self.station.retention_days = 30
+        self.station.save()
+        self.assertGreater(apply_retention()[1], 0)
+        rebuild_stats()
+        for unit, model in TIERS.items():
+            self.assertEqual(list(model.objects.order_by("date").values()), before[unit], unit)
+
+
+class PartitioningTests(APITestCase):
+    def partition_of(self, measurement):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT tableoid::regclass::text FROM api_measurement WHERE id = %s", [measurement.pk])
+            return cursor.fetchone()[0]
+
+    def test_create_partitions_moves_rows_out_of_default(self):
+        old = Measurement.objects.create(station=self.station, timestamp=timezone.now() - timedelta(days=70), temperature=1, humidity=2)
+        partition_measurements(months_ahead=1)
+        self.assertTrue(is_partitioned())
+        ahead = Measurement.objects.create(station=self.station, timestamp=timezone.now() + timedelta(days=120), temperature=3, humidity=4)
+        self.assertEqual(self.partition_of(ahead), "api_measurement_default")
+        create_partitions(months_ahead=5)
+        self.assertEqual(self.partition_of(ahead), f"api_measurement_p{ahead.timestamp:%Y%m}")
+        unpartition_measurements()
+        self.assertFalse(is_partitioned())
+        self.assertEqual(list(Measurement.objects.order_by("id").values_list("temperature", flat=True)), [1, 3])
+        self.assertGreater(Measurement.objects.create(station=self.station, temperature=5, humidity=6).pk, ahead.pk)
+        self.assertEqual(old.pk, Measurement.objects.earliest("timestamp").pk)
+
+
+@override_settings(SHARED_CACHE=True)
+class QueryBudgetTests(APITestCase):
+    """Query counts of the hot endpoints over three months of readings; any N+1 or extra lookup fails."""
+
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {Measurement._meta.db_table} (station_id, timestamp, temperature, humidity, created_at)
+                SELECT %s, ts, 20 + 10 * sin(extract(epoch FROM ts) / 86400.0), 60, now()
+                FROM generate_series(%s::timestamptz, %s::timestamptz, interval '1 hour') AS ts
+                """,
+                [self.station.pk, self.now - timedelta(days=90), self.now],
+            )
+        rebuild_stats([self.station.pk])
+        self.forget()
+
+    def forget(self):
+        forget_station(self.station)
+
+    def assertQueries(self, count, path, data=None, method="get", cold=True):
+        if cold:
+            self.forget()
+        with self.assertNumQueries(count):
+            if method == "post":
+                response = self.client.post(path, data, format="json")
+            else:
+                response = getattr(self.client, method)(path, data)
+        self.assertLess(response.status_code, 400, path)
+        return response
+
+    def test_latest(self):
+        self.assertQueries(1, "/api/measurements/latest/", {"station": self.station.pk})
+        self.assertQueries(0, "/api/measurements/latest/", {"station": self.station.pk}, cold=False)
+
+    def test_stats(self):
+        day = timezone.localdate(self.now)
+        params = {"station": self.station.pk, "timestamp__gt": (day - timedelta(days=30)).isoformat(), "timestamp__lt": day.isoformat()}
+        self.assertQueries(2, "/api/measurements/stats/", params)
+        self.assertQueries(0, "/api/measurements/stats/", params, cold=False)
+        self.assertQueries(2, "/api/measurements/stats/", {**params, "resolution": "month"})
+
+    def test_list(self):
+        month_ago = (self.now - timedelta(days=30)).isoformat()
+        self.assertQueries(4, "/api/measurements/", {"station": self.station.pk, "timestamp__gt": month_ago})
+        self.assertQueries(3, "/api/measurements/", {"station": self.station.pk, "pagination": "cursor"})
+
+    def test_stations(self):
+        self.assertQueries(3, "/api/stations/")
+        # Signed-in lists vary by user, so a hit still authenticates
+        self.assertQueries(1, "/api/stations/", cold=False)
+
+    def test_forecast(self):
+        with mock.patch("api.forecasts.fetch_basic_day", return_value=METEOBLUE_STUB), \
+                mock.patch("api.forecasts.lookup_city_name", return_value="X"):
+            self.assertQueries(3, "/api/forecast/", {"station": self.station.pk})
+            self.assertEqual(ForecastData.objects.count(), 1)
+            self.assertQueries(1, "/api/forecast/", {"station": self.station.pk}, cold=False)
+
+    def test_bulk_create_and_delete(self):
+        rows = [
+            {"station": self.station.pk, "temperature": 20.5, "humidity": 60, "timestamp": (self.now + timedelta(seconds=i)).isoformat()}
+            for i in range(500)
+        ]
+        self.assertQueries(9, "/api/measurements/bulk-create/?mode=fast", rows, method="post", cold=False)
+        params = urlencode({"station": self.station.pk, "timestamp__gt": self.now.isoformat()})
+        self.assertQueries(13, f"/api/measurements/bulk-delete/?{params}", method="delete", cold=False)
@@ -1,52 +1,163 @@
 from django import views
-from api.filters import MeasurementFilter, StationFilter, MeasurementStatFilter  # added MeasurementStatFilter
+from api.filters import MeasurementFilter, StationFilter
 from api.permissions import IsOwner
 from .models import Measurement, ForecastData, Station, MeasurementStat  # added MeasurementStat
-from .serializers import MeasurementSerializer, ForecastDataSerializer, StationSerializer, MeasurementStatSerializer  # added MeasurementStatSerializer
+from .serializers import (
+    MeasurementSerializer, StationSerializer,
+    MeasurementValuesSerializer, StationValuesSerializer, MeasurementStatValuesSerializer, format_datetime,
+)
+from .cache import (
+    STATIONS_SCOPE, bump_data_versions, cached, cached_response, station_scope,
+    get_latest_measurement, refresh_latest_measurements, clear_latest_measurement,
+)
+from .meteoblue import MeteoblueError, SingleFlight
+from .geocoding import assign_city_name
+from .forecasts import fetch_forecast, forecast_cache_key, forecast_json, fresh_forecast, grid_cell
+from .export import EXPORTERS
+from .series import (
+    BUCKET_SIZES, MAX_BUCKETS, MAX_LTTB_POINTS, MAX_LTTB_ROWS, MIN_LTTB_POINTS, bucket_aggregates, downsampled_series,
+)
+from .rollups import TIERS, daily_stats, period_start, rebuild_stats, record_measurements
+from .ingest import validate_rows, insert_measurements, ingest_stream, iter_ndjson, iter_csv
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound, UnsupportedMediaType
+from rest_framework.pagination import PageNumberPagination, CursorPagination, Cursor, _positive_int
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import timezone
-import requests
-from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date, quote_etag
 from django.conf import settings
-from django.db.models import Avg
-from datetime import datetime, time, timedelta  # added timedelta
-
-def convert_to_dms(lat, lon):
-        lat_deg = int(lat)
-        lat_min = int((abs(lat) - abs(lat_deg)) * 60)
-        lat_sec = (abs(lat) - abs(lat_deg) - lat_min / 60) * 3600
-        lat_direction = "N" if lat >= 0 else "S"
-        lon_deg = int(lon)
-        lon_min = int((abs(lon) - abs(lon_deg)) * 60)
-        lon_sec = (abs(lon) - abs(lon_deg) - lon_min / 60) * 3600
-        lon_direction = "E" if lon >= 0 else "W"
-        return f"{abs(lat_deg)}°{lat_min}'{lat_sec:.1f}\"{lat_direction} {abs(lon_deg)}°{lon_min}'{lon_sec:.1f}\"{lon_direction}"
-
-def coords_to_city_name(lat, lon):
-    query = convert_to_dms(lat, lon)
-    response = requests.get(
-            "https://www.meteoblue.com/en/server/search/query3",
-            params={"apikey": settings.METEOBLUE_API_KEY, "query": query},
+from django.db import connection, transaction
+from django.db.models import Max, Min, Q, Sum
+from django.db.models.functions import Trunc
+from datetime import datetime, time, timedelta
+from functools import partial
+
+def parse_range_bound(value, end=False):
+    """Parse an ISO datetime or a YYYY-MM-DD date (covering the whole day) into an aware datetime."""
+    # parse_datetime() also accepts bare dates, so check for those first
+    day = parse_date(value)
+    if day is not None:
+        parsed = datetime.combine(day, time.max if end else time.min)
+    else:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+# Coarsest rollup tier that can serve each resolution
+ROLLUP_TIER_FOR_RESOLUTION = {
+    "hour": "hour",
+    "day": "day",
+    "week": "day",
+    "month": "month",
+    "quarter": "month",
+    "year": "month",
+}
+
+def route_rollup_query(start, stop, resolution):
+    """Pick the coarsest rollup tier that serves ``resolution`` and whose periods line up with [start, stop).
+
+    Falls back to the hourly tier, which snaps unaligned edges to whole hours.
+    """
+    units = list(TIERS)
+    for unit in reversed(units[:units.index(ROLLUP_TIER_FOR_RESOLUTION[resolution]) + 1]):
+        if period_start(start, unit) == start and period_start(stop, unit) == stop:
+            return unit
+    return units[0]
+
+def rollup_series(station, start, stop, resolution):
+    unit = route_rollup_query(start, stop, resolution)
+    rows = (
+        TIERS[unit].objects.filter(station=station, date__gte=period_start(start, unit), date__lt=stop)
+        .annotate(period=Trunc("date", resolution, tzinfo=timezone.get_current_timezone()))
+        .values("period")
+        .annotate(
+            total=Sum("count"),
+            temperature_total=Sum("temperature_sum"),
+            humidity_total=Sum("humidity_sum"),
+            temperature_low=Min("temperature_min"),
+            temperature_high=Max("temperature_max"),
+            humidity_low=Min("humidity_min"),
+            humidity_high=Max("humidity_max"),
         )
-    if response.status_code == 200:
-        data = response.json()
-        results = data.get("results", [])
-        if results:
-            return results[0].get("name", "")
-        else:
-            return ""
+        .order_by("period")
+    )
+    results = [
+        {
+            "date": format_datetime(row["period"]),
+            "count": row["total"],
+            "temperature_avg": row["temperature_total"] / row["total"],
+            "temperature_min": row["temperature_low"],
+            "temperature_max": row["temperature_high"],
+            "humidity_avg": row["humidity_total"] / row["total"],
+            "humidity_min": row["humidity_low"],
+            "humidity_max": row["humidity_high"],
+        }
+        for row in rows if row["total"]
+    ]
+    return {"tier": unit, "resolution": resolution, "results": results}
+
+forecast_refreshes = SingleFlight()
+# Cached forecasts are refreshed in the background after an hour and dropped after six
+FORECAST_CACHE_SOFT_TIMEOUT = 3600
+FORECAST_CACHE_TIMEOUT = 6 * 3600
+
+BULK_DELETE_BATCH_SIZE = 50000
+
+def delete_measurements(queryset, batch_size=BULK_DELETE_BATCH_SIZE):
+    """Delete the measurements matched by ``queryset`` with raw DELETE statements.
+
+    Skips Django's deletion collector (Measurement has no dependents or signals)
+    and walks the primary key range in ``batch_size`` steps, so huge deletes never
+    hold one enormous statement. Returns the stations and time window that were
+    touched along with the number of deleted rows.
+    """
+    scope = list(
+        queryset.order_by().values("station").annotate(
+            start=Min("timestamp"), end=Max("timestamp"), first_id=Min("pk"), last_id=Max("pk")
+        )
+    )
+    if not scope:
+        return [], None, None, 0
+    table = Measurement._meta.db_table
+    deleted = 0
+    first_id = min(row["first_id"] for row in scope)
+    last_id = max(row["last_id"] for row in scope)
+    with connection.cursor() as cursor:
+        for low in range(first_id, last_id + 1, batch_size):
+            sql, params = queryset.filter(pk__gte=low, pk__lt=low + batch_size).values("pk").query.sql_with_params()
+            cursor.execute(f"DELETE FROM {table} WHERE id IN ({sql})", params)
+            deleted += cursor.rowcount
+    start = min(row["start"] for row in scope)
+    end = max(row["end"] for row in scope)
+    return [row["station"] for row in scope], start, end, deleted
+
+def values_list_response(view, serializer_class):
+    """ListModelMixin.list() over ``.values()`` rows rendered by a ValuesSerializer."""
+    queryset = serializer_class.values(view.filter_queryset(view.get_queryset()))
+    page = view.paginate_queryset(queryset)
+    if page is not None:
+        return view.get_paginated_response(serializer_class(page, many=True).data)
+    return Response(serializer_class(queryset, many=True).data)
 
 class PermissionMixin(viewsets.GenericViewSet):
     unauthorized_actions = [
         'list',
         'retrieve',
         'latest_measurement',
-        'stats'
+        'stats',
+        'export',
+        'series',
     ]
 
     def get_permissions(self):
@@ -54,6 +165,11 @@ class PermissionMixin(viewsets.GenericViewSet):
             return []
         return [permission() for permission in getattr(self, 'permission_classes', [])]
 
+    def perform_authentication(self, request):
+        # Public actions resolve request.user lazily, so cached reads skip the user lookup
+        if self.action not in self.unauthorized_actions:
+            super().perform_authentication(request)
+
 class StationViewSet(PermissionMixin, viewsets.ModelViewSet):
     authentication_classes = [JWTAuthentication]
     queryset = Station.objects.all()
@@ -66,22 +182,114 @@ class StationViewSet(PermissionMixin, viewsets.ModelViewSet):
             queryset = queryset.filter(user=self.request.user)
         return queryset
 
-    def update_city_name(self, instance):
-        instance.city_name = coords_to_city_name(instance.latitude, instance.longitude)
-        instance.save()
-        return instance
+    def list(self, request, *args, **kwargs):
+        # Page links embed the host, and signed-in users only see their own stations
+        user = request.user.pk if request.user.is_authenticated else 'anonymous'
+        return cached_response(
+            'stations', request, partial(values_list_response, self, StationValuesSerializer),
+            STATIONS_SCOPE, vary=f'{request.get_host()}_{user}',
+        )
 
     def perform_create(self, serializer):
-        self.update_city_name(serializer.save())
+        # Unknown coordinates are geocoded in the background so the write never waits on Meteoblue
+        assign_city_name(serializer.save())
+        bump_data_versions([STATIONS_SCOPE])
 
     def perform_update(self, serializer):
-        self.update_city_name(serializer.save())
+        assign_city_name(serializer.save())
+        bump_data_versions([STATIONS_SCOPE])
+
+    def perform_destroy(self, instance):
+        station_id = instance.pk
+        instance.delete()
+        clear_latest_measurement(station_id)
+        bump_data_versions([STATIONS_SCOPE])
 
-class ForecastPagination(PageNumberPagination):
+class TrustedPageSizeMixin:
+    # Staff accounts (e.g. internal jobs) may request much larger pages
+    trusted_max_page_size = 1000
+
+    def get_page_size(self, request):
+        if request.user.is_staff and self.page_size_query_param in request.query_params:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param], strict=True, cutoff=self.trusted_max_page_size
+                )
+            except ValueError:
+                return self.page_size
+        return super().get_page_size(request)
+
+class ForecastPagination(TrustedPageSizeMixin, PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 30
 
+class MeasurementCursorPagination(TrustedPageSizeMixin, CursorPagination):
+    """Keyset pagination on (timestamp, id): no COUNT query and no OFFSET scan at any depth.
+
+    DRF's CursorPagination keys on the first ordering field and pages through equal
+    values with an offset, so bursts of rows sharing a timestamp would still be
+    scanned. Here the cursor position carries both columns, so every page is an
+    index range scan that starts right after the previous one.
+    """
+    ordering = ('timestamp', 'id')
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 30
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        if self.cursor is not None and self.cursor.position is not None:
+            timestamp, pk = self.decode_position(self.cursor.position)
+            lookup = "lt" if reverse else "gt"
+            # The redundant bound on timestamp alone lets the planner range-scan the timestamp indexes
+            queryset = queryset.filter(**{f"timestamp__{lookup}e": timestamp}).filter(
+                Q(**{f"timestamp__{lookup}": timestamp}) | Q(timestamp=timestamp, **{f"id__{lookup}": pk})
+            )
+        queryset = queryset.order_by(*(f"-{field}" for field in self.ordering) if reverse else self.ordering)
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        return self.page
+
+    def encode_position(self, item):
+        # Rows are .values() dicts on the list endpoint
+        if isinstance(item, dict):
+            return f"{item['timestamp'].isoformat()}|{item['id']}"
+        return f"{item.timestamp.isoformat()}|{item.pk}"
+
+    def decode_position(self, position):
+        timestamp, _, pk = position.rpartition("|")
+        try:
+            timestamp = parse_datetime(timestamp)
+            pk = int(pk)
+        except ValueError:
+            timestamp = None
+        if timestamp is None:
+            raise NotFound(self.invalid_cursor_message)
+        return timestamp, pk
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.encode_position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.encode_position(self.page[0])))
+
 class MeasurementViewSet(PermissionMixin, viewsets.ModelViewSet):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated, IsOwner]
@@ -90,48 +298,200 @@ class MeasurementViewSet(PermissionMixin, viewsets.ModelViewSet):
     filterset_class = MeasurementFilter
     pagination_class = ForecastPagination
 
+    @property
+    def paginator(self):
+        # ?pagination=cursor (or following a cursor link) switches to keyset pagination
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params if self.request is not None else {}
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = MeasurementCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def list(self, request, *args, **kwargs):
+        return values_list_response(self, MeasurementValuesSerializer)
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            instance = serializer.save()
+            record_measurements([instance])
+        refresh_latest_measurements([instance.station_id])
+
+    def perform_update(self, serializer):
+        # save() updates the instance in place, so remember what is being replaced
+        previous_station_id = serializer.instance.station_id
+        previous_timestamp = serializer.instance.timestamp
+        with transaction.atomic():
+            instance = serializer.save()
+            rebuild_stats(
+                [previous_station_id, instance.station_id],
+                since=min(previous_timestamp, instance.timestamp),
+                until=max(previous_timestamp, instance.timestamp),
+            )
+        refresh_latest_measurements([previous_station_id, instance.station_id])
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            rebuild_stats([instance.station_id], since=instance.timestamp, until=instance.timestamp)
+        refresh_latest_measurements([instance.station_id])
+
     @action(detail=False, methods=['delete'], url_path='bulk-delete')
     def bulk_delete(self, request):
-        f = MeasurementFilter(request.query_params, queryset=Measurement.objects.all())
+        # Only ever touches the caller's own stations, whatever the filter says
+        f = MeasurementFilter(request.query_params, queryset=Measurement.objects.filter(station__user=request.user))
         if not f.is_valid():
             return Response(f.errors, status=400)
-        f.qs.delete()
-        f_stats = MeasurementStatFilter(request.query_params, queryset=MeasurementStat.objects.all())
-        f_stats.qs.delete()
-        return Response({"message": "Measurements and their stats for the station have been deleted"})
+        station = f.form.cleaned_data.get("station")
+        if station is not None and station.user_id != request.user.pk:
+            return Response({"error": "The station does not belong to the current user."}, status=403)
+        with transaction.atomic():
+            station_ids, start, end, deleted = delete_measurements(f.qs)
+            if station_ids:
+                rebuild_stats(station_ids, since=start, until=end)
+        refresh_latest_measurements(station_ids)
+        return Response({
+            "message": "Measurements and their stats for the station have been deleted",
+            "deleted": deleted,
+        })
 
     @action(detail=False, methods=['post'], url_path='bulk-create')
     def bulk_create(self, request):
+        if request.query_params.get("mode") == "fast":
+            return self.fast_bulk_create(request)
         serializer = MeasurementSerializer(data=request.data, many=True)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                instances = serializer.save()
+                record_measurements(instances)
+            refresh_latest_measurements(instance.station_id for instance in instances)
             return Response(serializer.data, status=201)
         return Response(serializer.errors, status=400)
 
+    def fast_bulk_create(self, request):
+        # Validates all rows up front and reports a summary instead of echoing rows back
+        if not isinstance(request.data, list):
+            return Response({"error": "Expected a list of measurements"}, status=400)
+        measurements, rejected = validate_rows(request.data, request.user)
+        insert_measurements(measurements)
+        refresh_latest_measurements(measurement.station_id for measurement in measurements)
+        summary = {"inserted": len(measurements), "rejected": rejected}
+        return Response(summary, status=201 if measurements or not rejected else 400)
+
+    @action(detail=False, methods=['post'], url_path='ingest')
+    def ingest(self, request):
+        # Reads the body line by line instead of through request.data, so uploads are never buffered whole
+        readers = {"application/x-ndjson": iter_ndjson, "text/csv": iter_csv}
+        media_type = request.content_type.split(";")[0].strip()
+        if media_type not in readers:
+            raise UnsupportedMediaType(media_type)
+        summary, station_ids = ingest_stream(readers[media_type](request.stream or []), request.user)
+        refresh_latest_measurements(station_ids)
+        return Response(summary, status=201 if summary["inserted"] or not summary["rejected_count"] else 400)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        output = request.query_params.get("output", "csv")
+        if output not in EXPORTERS:
+            return Response({"error": f"output must be one of: {', '.join(EXPORTERS)}"}, status=400)
+        # Anonymous callers may only export one station at a time, never the whole table
+        if not request.query_params.get("station") and not request.user.is_authenticated:
+            return Response({"error": "station query parameter is required"}, status=400)
+        f = MeasurementFilter(request.query_params, queryset=Measurement.objects.all())
+        if not f.is_valid():
+            return Response(f.errors, status=400)
+        stream, content_type = EXPORTERS[output]
+        response = StreamingHttpResponse(stream(f.qs), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="measurements.{output}"'
+        return response
+
+    @action(detail=False, methods=['get'], url_path='series')
+    def series(self, request):
+        station_id = request.query_params.get("station")
+        timestamp_gt = request.query_params.get("timestamp__gt")
+        timestamp_lt = request.query_params.get("timestamp__lt")
+        if not station_id or not timestamp_gt or not timestamp_lt:
+            return Response({"error": "station, timestamp__gt and timestamp__lt query parameters are required"}, status=400)
+        try:
+            start = parse_range_bound(timestamp_gt)
+            end = parse_range_bound(timestamp_lt, end=True)
+        except ValueError:
+            start = end = None
+        if start is None or end is None:
+            return Response({"error": "Timestamps must be ISO 8601 datetimes or YYYY-MM-DD dates"}, status=400)
+        if start > end:
+            return Response({"error": "timestamp__gt must be before or equal to timestamp__lt"}, status=400)
+        if not station_id.isdigit() or not Station.objects.filter(pk=station_id).exists():
+            return Response({"error": "Station not found"}, status=404)
+
+        if request.query_params.get("mode") == "lttb":
+            try:
+                points = _positive_int(request.query_params.get("points", 500), strict=True, cutoff=MAX_LTTB_POINTS)
+            except ValueError:
+                points = 0
+            if points < MIN_LTTB_POINTS:
+                return Response(
+                    {"error": f"points must be an integer between {MIN_LTTB_POINTS} and {MAX_LTTB_POINTS}"}, status=400
+                )
+            series = downsampled_series(station_id, start, end, points)
+            if series is None:
+                return Response(
+                    {"error": f"The range holds more than {MAX_LTTB_ROWS} measurements; narrow it or use buckets"},
+                    status=400,
+                )
+            return Response(series)
+
+        bucket = request.query_params.get("bucket", "1h")
+        if bucket not in BUCKET_SIZES:
+            return Response({"error": f"bucket must be one of: {', '.join(BUCKET_SIZES)}"}, status=400)
+        if (end - start).total_seconds() / BUCKET_SIZES[bucket] > MAX_BUCKETS:
+            return Response({"error": f"The range cannot span more than {MAX_BUCKETS} buckets"}, status=400)
+        return Response(bucket_aggregates(station_id, start, end, BUCKET_SIZES[bucket]))
+
     @action(detail=False, methods=['get'], url_path='latest')
     def latest_measurement(self, request):
         station_id = request.query_params.get("station")
         if not station_id:
             return Response({"error": "station query parameter is required"}, status=400)
-        try:
-            station = Station.objects.get(pk=station_id)
-        except Station.DoesNotExist:
+        if not station_id.isdigit():
             return Response({"error": "Station not found"}, status=404)
 
-        latest_measurement = Measurement.objects.filter(station=station).order_by('-timestamp').first()
-        if not latest_measurement:
+        entry = get_latest_measurement(int(station_id))
+        if entry is None:
+            if not Station.objects.filter(pk=station_id).exists():
+                return Response({"error": "Station not found"}, status=404)
             return Response({"error": "No measurements found for this station"}, status=404)
 
-        serializer = MeasurementSerializer(latest_measurement)
-        return Response(serializer.data)
+        etag = quote_etag(entry["etag"])
+        last_modified = int(entry["last_modified"])
+        response = HttpResponse(entry["content"], content_type='application/json')
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        # Passing the response makes a 304 repeat its ETag and Last-Modified
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified, response=response)
+        return not_modified if not_modified is not None else response
 
     @action(detail=False, methods=['get'], url_path='stats')
     def stats(self, request):
+        station_id = request.query_params.get("station")
+        if not station_id or not station_id.isdigit():
+            return self.build_stats(request)
+        # Daily stats treat today differently, so entries must not outlive the day.
+        # The scope must match the one writes bump, whatever the spelling of the id (e.g. "01")
+        return cached_response(
+            'stats', request, lambda: self.build_stats(request), station_scope(int(station_id)), vary=timezone.localdate()
+        )
+
+    def build_stats(self, request):
         station_id = request.query_params.get("station")
         timestamp_gt = request.query_params.get("timestamp__gt")
         timestamp_lt = request.query_params.get("timestamp__lt")
         if not station_id or not timestamp_gt or not timestamp_lt:
             return Response({"error": "station, timestamp__gt and timestamp__lt query parameters are required"}, status=400)
+        resolution = request.query_params.get("resolution")
+        if resolution is not None:
+            return self.rollup_stats(request, station_id, timestamp_gt, timestamp_lt, resolution)
         try:
             start_dt = datetime.strptime(timestamp_gt, "%Y-%m-%d")
             end_dt = datetime.strptime(timestamp_lt, "%Y-%m-%d")
@@ -139,36 +499,36 @@ class MeasurementViewSet(PermissionMixin, viewsets.ModelViewSet):
             return Response({"error": "Dates must be formatted as YYYY-MM-DD"}, status=400)
         try:
             station = Station.objects.get(pk=station_id)
-        except Station.DoesNotExist:
+        except (Station.DoesNotExist, ValueError):
             return Response({"error": "Station not found"}, status=404)
         start_date = start_dt.date()
         end_date = end_dt.date()
         if start_date > end_date:
             return Response({"error": "timestamp__gt must be before or equal to timestamp__lt"}, status=400)
-        if (end_date - start_date).days > 7:
-            return Response({"error": "The date range cannot be more than 7 days apart"}, status=400)
-        stats_list = []
-        today = timezone.localdate()
-        current_date = end_date
-        while current_date >= start_date:
-            start = datetime.combine(current_date, time.min)
-            end = datetime.combine(current_date, time.max)
-            measurements = Measurement.objects.filter(station=station, timestamp__gte=start, timestamp__lte=end)
-            if (current_date == today and measurements.count() > 0) or measurements.count() > 1:
-                stat, created = MeasurementStat.objects.get_or_create(
-                    station=station, date=datetime.combine(current_date, time.min)
-                )
-                if current_date == today or created:
-                    aggregates = measurements.aggregate(
-                        temperature=Avg("temperature"),
-                        humidity=Avg("humidity"),
-                    )
-                    stat.temperature = aggregates["temperature"]
-                    stat.humidity = aggregates["humidity"]
-                    stat.save()
-                stats_list.append(stat)
-            current_date -= timedelta(days=1)
-        return Response(MeasurementStatSerializer(stats_list, many=True).data)
+        rows = MeasurementStatValuesSerializer.values(daily_stats(station, start_date, end_date))
+        return Response(MeasurementStatValuesSerializer(rows, many=True).data)
+
+    def rollup_stats(self, request, station_id, timestamp_gt, timestamp_lt, resolution):
+        # Serves any range from the precomputed hourly/daily/monthly tiers
+        if resolution not in ROLLUP_TIER_FOR_RESOLUTION:
+            return Response({"error": f"resolution must be one of: {', '.join(ROLLUP_TIER_FOR_RESOLUTION)}"}, status=400)
+        try:
+            start = parse_range_bound(timestamp_gt)
+            stop = parse_range_bound(timestamp_lt, end=True)
+        except ValueError:
+            start = stop = None
+        if start is None or stop is None:
+            return Response({"error": "Timestamps must be ISO 8601 datetimes or YYYY-MM-DD dates"}, status=400)
+        if stop.time() == time.max:
+            # A plain end date covers the whole day
+            stop += timedelta(microseconds=1)
+        if start >= stop:
+            return Response({"error": "timestamp__gt must be before timestamp__lt"}, status=400)
+        try:
+            station = Station.objects.get(pk=station_id)
+        except (Station.DoesNotExist, ValueError):
+            return Response({"error": "Station not found"}, status=404)
+        return Response(rollup_series(station, start, stop, resolution))
 
 class ForecastViewSet(PermissionMixin, viewsets.GenericViewSet):
     authentication_classes = [JWTAuthentication]
@@ -183,64 +543,32 @@ class ForecastViewSet(PermissionMixin, viewsets.GenericViewSet):
         except Station.DoesNotExist:
             return Response({"error": "Station not found"}, status=404)
 
-        cache_key = f'meteoblue_data_{station_id}'
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return Response(cached_data)
-
-        # Check if there is valid data in the database for the station's coordinates
-        one_day_ago = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        valid_data = ForecastData.objects.filter(
-            created_at__gte=one_day_ago,
-            latitude=station.latitude,
-            longitude=station.longitude,
-        ).first()
-        if valid_data:
-            serialized_data = ForecastDataSerializer(valid_data).data
-            cache.set(cache_key, serialized_data, timeout=3600)
-            return Response(serialized_data)
-
-        # Fetch new data from the API using the station's latitude and longitude
-        params = {
-            'lat': station.latitude,
-            'lon': station.longitude,
-            'apikey': settings.METEOBLUE_API_KEY,
-        }
-        response = requests.get('https://my.meteoblue.com/packages/basic-day', params=params)
-        if response.status_code == 200:
-            data = response.json()
-            lat = data['metadata']['latitude']
-            lon = data['metadata']['longitude']
-            if lat != station.latitude or lon != station.longitude:
-                station.latitude = lat
-                station.longitude = lon
-                station.save()
-            city_name = coords_to_city_name(lat, lon)
-            meteoblue_data = ForecastData.objects.create(
-                latitude=lat,
-                longitude=lon,
-                city_name=city_name,
-                modelrun_utc=data['metadata']['modelrun_utc'],
-                utc_timeoffset=data['metadata']['utc_timeoffset'],
-                generation_time_ms=data['metadata']['generation_time_ms'],
-                time=data['data_day']['time'],
-                temperature_instant=data['data_day']['temperature_instant'],
-                precipitation=data['data_day']['precipitation'],
-                predictability=data['data_day']['predictability'],
-                temperature_mean=data['data_day']['temperature_mean'],
-                temperature_max=data['data_day']['temperature_max'],
-                temperature_min=data['data_day']['temperature_min'],
-                felttemperature_mean=data['data_day']['felttemperature_mean'],
-                relativehumidity_mean=data['data_day']['relativehumidity_mean'],
-                windspeed_mean=data['data_day']['windspeed_mean'],
-                sealevelpressure_mean=data['data_day']['sealevelpressure_mean'],
-                precipitation_hours=data['data_day']['precipitation_hours'],
-                pictocode=data['data_day']['pictocode'],
-                winddirection=data['data_day']['winddirection'],
-                uvindex=data['data_day']['uvindex']
+        def load():
+            # Concurrent misses for the same grid cell share one database check and upstream fetch
+            return forecast_refreshes.do(
+                grid_cell(station.latitude, station.longitude), lambda: self.load_forecast(station)
             )
-            serialized_data = ForecastDataSerializer(meteoblue_data).data
-            cache.set(cache_key, serialized_data, timeout=3600)
-            return Response(serialized_data)
-        else:
-            return Response({'error': 'Failed to fetch data from Meteoblue'}, status=response.status_code)
+
+        try:
+            content = cached(
+                'forecast', forecast_cache_key(station_id), load,
+                FORECAST_CACHE_TIMEOUT, soft_timeout=FORECAST_CACHE_SOFT_TIMEOUT,
+            )
+        except MeteoblueError as exc:
+            return Response({'error': 'Failed to fetch data from Meteoblue'}, status=exc.status_code)
+        # Cached as rendered JSON, so hits skip the serializer and renderer entirely
+        return HttpResponse(content, content_type='application/json')
+
+    def load_forecast(self, station):
+        forecast = fresh_forecast(station.latitude, station.longitude)
+        if forecast is None:
+            forecast = fetch_forecast(station.latitude, station.longitude)
+        return forecast_json(forecast)
+
+
+def metrics(request):
+    """Prometheus scrape endpoint, routed only when METRICS_ENABLED is set."""
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponse(status=401)
+    return HttpResponse(render_metrics(), content_type=METRICS_CONTENT_TYPE)
@@ -11,10 +11,12 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from datetime import timedelta
+import importlib.util
 import os
 from pathlib import Path
 import environ
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 from django.core.management.utils import get_random_secret_key
 
 env = environ.Env(
@@ -23,6 +25,20 @@ env = environ.Env(
     DJANGO_TRUSTED_ORIGIN=(str, "http://localhost"),
     DJANGO_PAGINATION_LIMIT=(int, 10),
     METEOBLUE_API_KEY=(str, ""),
+    CACHE_URL=(str, "locmemcache://unique-snowflake"),
+    FAST_JSON=(bool, False),
+    PERF_INSTRUMENTATION=(bool, False),
+    PERF_SLOW_REQUEST_MS=(float, 500),
+    PERF_PROFILE_SAMPLE_RATE=(float, 0),
+    PERF_PROFILE_DIR=(str, "/tmp/ms-profiles"),
+    METRICS_ENABLED=(bool, False),
+    METRICS_TOKEN=(str, ""),
+    DB_CONN_MAX_AGE=(int, 60),
+    DB_CONN_HEALTH_CHECKS=(bool, True),
+    DB_POOL=(bool, False),
+    DB_POOL_MIN_SIZE=(int, 2),
+    DB_POOL_MAX_SIZE=(int, 8),
+    DB_POOL_TIMEOUT=(float, 10),
 )
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -77,6 +93,31 @@ MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
 ]
 
+# Server-Timing headers and per-request log lines with SQL, cache, Meteoblue and
+# serializer timings; slow requests are logged with their SQL (see api/middleware.py).
+# cProfile hooks every thread of the process, so sample profiles with gunicorn
+# --threads 1; profiles that overlapped another request are discarded
+PERF_INSTRUMENTATION = env("PERF_INSTRUMENTATION")
+PERF_SLOW_REQUEST_MS = env("PERF_SLOW_REQUEST_MS")
+PERF_PROFILE_SAMPLE_RATE = env("PERF_PROFILE_SAMPLE_RATE")
+PERF_PROFILE_DIR = env("PERF_PROFILE_DIR")
+if PERF_INSTRUMENTATION:
+    MIDDLEWARE.insert(0, 'api.middleware.PerformanceMiddleware')
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'handlers': {'console': {'class': 'logging.StreamHandler'}},
+        'loggers': {'api.performance': {'handlers': ['console'], 'level': 'INFO', 'propagate': False}},
+    }
+
+# Prometheus metrics at /metrics (see api/metrics.py); counters are kept in the cache
+# and summed over all gunicorn workers, so they require a Redis CACHE_URL.
+# With METRICS_TOKEN set, scrapers must send "Authorization: Bearer <token>"
+METRICS_ENABLED = env("METRICS_ENABLED")
+METRICS_TOKEN = env("METRICS_TOKEN")
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(0, 'api.middleware.MetricsMiddleware')
+
 ROOT_URLCONF = 'meteostanica.urls'
 
 TEMPLATES = [
@@ -101,19 +142,40 @@ WSGI_APPLICATION = 'meteostanica.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Each thread keeps its connection for DB_CONN_MAX_AGE seconds (0 closes it after every
+# request) and checks it is still usable before reusing it in a new request.
+# DB_POOL instead shares an in-process psycopg 3 pool between the threads of a worker;
+# it needs the `pool` extra (`poetry install -E pool`) and reports its counters in /metrics.
+# DB_POOL_MAX_SIZE leaves room beyond the 4 gunicorn threads for the geocoding
+# executor and background cache refreshes, so they do not queue behind requests
+DB_POOL = env("DB_POOL")
 DATABASES = {
-    'default': dj_database_url.config()
+    'default': dj_database_url.config(
+        # Django rejects persistent connections together with a pool
+        conn_max_age=0 if DB_POOL else env("DB_CONN_MAX_AGE"),
+        conn_health_checks=env("DB_CONN_HEALTH_CHECKS"),
+    )
 }
+if DB_POOL:
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': env("DB_POOL_MIN_SIZE"),
+        'max_size': env("DB_POOL_MAX_SIZE"),
+        'timeout': env("DB_POOL_TIMEOUT"),
+    }
 
 
 # Caching
 
+# Per-process by default; set CACHE_URL to redis://host:6379/0 so all workers share
+# entries, locks and hit/miss counters (see api/cache.py). Redis is the only shared
+# backend supported: the file cache's add() and incr() are not atomic across processes
 CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-    }
+    'default': env.cache_url("CACHE_URL"),
 }
+if CACHES['default']['BACKEND'] == 'django.core.cache.backends.filebased.FileBasedCache':
+    raise ImproperlyConfigured("CACHE_URL must be locmemcache:// or redis://; the file cache cannot be shared safely")
+# Decided once at startup: response caching and metrics need every worker to see the same keys
+SHARED_CACHE = CACHES['default']['BACKEND'] == 'django.core.cache.backends.redis.RedisCache'
 
 
 # Password validation
@@ -170,6 +232,22 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',  # drf-spectacular settings
 }
 
+# Renders and parses API JSON with orjson, from the `fast-json` extra
+# (`poetry install -E fast-json`; see api/renderers.py)
+FAST_JSON = env("FAST_JSON")
+if FAST_JSON:
+    if importlib.util.find_spec("orjson") is None:
+        raise ImproperlyConfigured("FAST_JSON requires orjson (poetry install -E fast-json)")
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ]
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = [
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ]
+
 SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('JWT',),
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
@@ -1,7 +1,15 @@
+import argparse
+import base64
+import heapq
 import json
 import os
 import requests
-from datetime import datetime
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
 import random
 import sys
 import dataclasses
@@ -57,7 +65,244 @@ now = datetime.now()
 data = Temp(now)
 temps: list[dict] = []
 
+# ---------------------------------------------------------------------------
+# Fleet load generator: `python test.py load --help`
+# ---------------------------------------------------------------------------
+
+USERS_ROUTE = f"{URL}/auth/users/"
+STATIONS_ROUTE = f"{URL}/api/stations/"
+READ_ROUTES = {
+    "latest": lambda station: (f"{URL}/api/measurements/latest/", {"station": station}),
+    "stats": lambda station: (f"{URL}/api/measurements/stats/", {
+        "station": station,
+        "timestamp__gt": (date.today() - timedelta(days=7)).isoformat(),
+        "timestamp__lt": date.today().isoformat(),
+    }),
+    "forecast": lambda station: (f"{URL}/api/forecast/", {"station": station}),
+}
+
+local = threading.local()
+login_lock = threading.Lock()
+
+
+def session(keepalive: bool) -> requests.Session:
+    # One session per worker thread, so connections are reused without being shared across threads
+    if not hasattr(local, "session"):
+        local.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        local.session.mount("http://", adapter)
+        local.session.mount("https://", adapter)
+        if not keepalive:
+            local.session.headers["Connection"] = "close"
+    return local.session
+
+
+class Recorder:
+    """Collects latency samples and error counts per endpoint.
+
+    Latency runs from the time a request was scheduled, not from when a worker
+    picked it up, so time spent queued behind a saturated generator is counted
+    instead of hidden (coordinated omission).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint: str, scheduled: float, ok: bool):
+        elapsed = (time.monotonic() - scheduled) * 1000
+        with self.lock:
+            self.samples[endpoint].append(elapsed)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def report(self, duration: float) -> dict:
+        def percentile(values, q):
+            return values[min(len(values) - 1, int(len(values) * q))]
+
+        report = {}
+        for endpoint, values in sorted(self.samples.items()):
+            values = sorted(values)
+            report[endpoint] = {
+                "requests": len(values),
+                "errors": self.errors[endpoint],
+                "throughput_rps": round(len(values) / duration, 2),
+                "p50_ms": round(percentile(values, 0.50), 2),
+                "p95_ms": round(percentile(values, 0.95), 2),
+                "p99_ms": round(percentile(values, 0.99), 2),
+            }
+        return report
+
+
+def send(method: str, url: str, keepalive: bool, **kwargs):
+    try:
+        return session(keepalive).request(method, url, timeout=30, **kwargs)
+    except requests.RequestException:
+        return None
+
+
+def request(recorder: Recorder, endpoint: str, method: str, url: str, keepalive: bool, scheduled: float = None, **kwargs):
+    scheduled = time.monotonic() if scheduled is None else scheduled
+    response = send(method, url, keepalive, **kwargs)
+    recorder.record(endpoint, scheduled, response is not None and response.status_code < 400)
+    return response
+
+
+def token_expired(token: str, margin: float = 60) -> bool:
+    """True if the JWT expires within ``margin`` seconds or its exp claim cannot be read."""
+    try:
+        payload = token.split()[-1].split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return claims["exp"] - margin < time.time()
+    except (IndexError, KeyError, ValueError):
+        return True
+
+
+def relogin(station: dict, keepalive: bool, stale_token: str) -> str:
+    with login_lock:
+        # Another thread may have logged the station in again already
+        if station["token"] == stale_token:
+            response = send("POST", AUTH_URL, keepalive, json={"username": station["username"], "password": station["password"]})
+            if response is not None and response.ok:
+                station["token"] = f"JWT {response.json()['access']}"
+    return station["token"]
+
+
+def station_request(recorder: Recorder, endpoint: str, method: str, url: str, station: dict, args, scheduled: float, **kwargs):
+    """Request as the station's account, logging in again when its token has expired or is rejected."""
+    token = station["token"]
+    if token_expired(token):
+        token = relogin(station, args.keepalive, token)
+    response = send(method, url, args.keepalive, headers={"Authorization": token}, **kwargs)
+    if response is not None and response.status_code == 401:
+        token = relogin(station, args.keepalive, token)
+        response = send(method, url, args.keepalive, headers={"Authorization": token}, **kwargs)
+    recorder.record(endpoint, scheduled, response is not None and response.status_code < 400)
+    return response
+
+
+def provision_station(index: int, run_id: str, keepalive: bool, recorder: Recorder) -> dict:
+    """Register an account, log it in and create its station."""
+    username = f"load-{run_id}-{index}"
+    password = uuid.uuid4().hex
+    request(recorder, "register", "POST", USERS_ROUTE, keepalive, json={
+        "username": username, "email": f"{username}@example.com", "password": password,
+    })
+    response = request(recorder, "login", "POST", AUTH_URL, keepalive, json={"username": username, "password": password})
+    response.raise_for_status()
+    token = f"JWT {response.json()['access']}"
+    response = request(recorder, "create-station", "POST", STATIONS_ROUTE, keepalive, headers={"Authorization": token}, json={
+        "name": username, "latitude": round(random.uniform(47.7, 49.6), 4), "longitude": round(random.uniform(16.8, 22.5), 4),
+    })
+    response.raise_for_status()
+    return {"username": username, "password": password, "token": token, "station": response.json()["id"]}
+
+
+def load_fleet(args, recorder: Recorder) -> list[dict]:
+    fleet = []
+    if args.accounts and os.path.exists(args.accounts):
+        with open(args.accounts) as accounts:
+            fleet = json.load(accounts)
+    missing = args.stations - len(fleet)
+    if missing > 0:
+        run_id = uuid.uuid4().hex[:8]
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            fleet += executor.map(lambda index: provision_station(index, run_id, args.keepalive, recorder), range(missing))
+        if args.accounts:
+            with open(args.accounts, "w") as accounts:
+                json.dump(fleet, accounts)
+    return fleet
+
+
+def ingest(station: dict, args, recorder: Recorder, scheduled: float):
+    now = datetime.now(timezone.utc)
+    readings = [
+        {
+            "station": station["station"],
+            "timestamp": (now - timedelta(seconds=args.cadence * i / args.batch)).isoformat(),
+            "temperature": round(random.uniform(-10, 35), 1),
+            "humidity": round(random.uniform(20, 95), 1),
+        }
+        for i in range(args.batch)
+    ]
+    station_request(recorder, "ingest", "POST", f"{CREATE_ROUTE}?mode=fast", station, args, scheduled, json=readings)
+
+
+def read(station: dict, endpoint: str, args, recorder: Recorder, scheduled: float):
+    url, params = READ_ROUTES[endpoint](station["station"])
+    station_request(recorder, endpoint, "GET", url, station, args, scheduled, params=params)
+
+
+def run_load(argv: list[str]):
+    parser = argparse.ArgumentParser(prog="test.py load", description="Simulate a fleet of stations against the API")
+    parser.add_argument("--stations", type=int, default=100, help="simulated stations, each with its own account")
+    parser.add_argument("--cadence", type=float, default=60, help="seconds between uploads of one station")
+    parser.add_argument("--batch", type=int, default=1, help="readings per upload")
+    parser.add_argument("--read-rate", type=float, default=10, help="read requests per second across the fleet")
+    parser.add_argument("--read-mix", default="latest=6,stats=3,forecast=1", help="relative weights of read endpoints")
+    parser.add_argument("--duration", type=float, default=60, help="seconds to run after provisioning")
+    parser.add_argument("--concurrency", type=int, default=50, help="worker threads issuing requests")
+    parser.add_argument("--no-keepalive", dest="keepalive", action="store_false", help="open a new connection per request")
+    parser.add_argument("--accounts", help="JSON file to reuse provisioned accounts across runs")
+    parser.add_argument("--report", help="write the report as JSON to this file")
+    args = parser.parse_args(argv)
+    mix = {name: float(weight) for name, weight in (item.split("=") for item in args.read_mix.split(","))}
+
+    setup = Recorder()
+    accounts = load_fleet(args, setup)
+    fleet = accounts[:args.stations]
+    print(f"{len(fleet)} stations ready")
+
+    recorder = Recorder()
+    start = time.monotonic()
+    # (due time, sequence, kind, station index); uploads are spread evenly over the first cadence
+    schedule = [(start + args.cadence * i / len(fleet), i, "ingest", i) for i in range(len(fleet))]
+    if args.read_rate > 0:
+        schedule.append((start, len(fleet), "read", None))
+    heapq.heapify(schedule)
+    sequence = len(schedule)
+    lag = 0.0
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        while schedule and schedule[0][0] < start + args.duration:
+            due, _, kind, index = heapq.heappop(schedule)
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                lag = max(lag, -delay)
+            if kind == "ingest":
+                executor.submit(ingest, fleet[index], args, recorder, due)
+                next_due = due + args.cadence
+            else:
+                endpoint = random.choices(list(mix), weights=list(mix.values()))[0]
+                executor.submit(read, random.choice(fleet), endpoint, args, recorder, due)
+                next_due = due + random.expovariate(args.read_rate)
+            sequence += 1
+            heapq.heappush(schedule, (next_due, sequence, kind, index))
+    duration = time.monotonic() - start
+    if args.accounts:
+        # Keep tokens refreshed during the run for the next one
+        with open(args.accounts, "w") as output:
+            json.dump(accounts, output)
+
+    report = {"stations": len(fleet), "duration_s": round(duration, 1), "max_schedule_lag_s": round(lag, 3),
+              "endpoints": recorder.report(duration)}
+    print(f"{'endpoint':<10} {'requests':>8} {'errors':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for endpoint, row in report["endpoints"].items():
+        print(f"{endpoint:<10} {row['requests']:>8} {row['errors']:>6} {row['throughput_rps']:>8} "
+              f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8}")
+    if lag > 1:
+        print(f"warning: requests started up to {lag:.1f}s late; raise --concurrency for accurate numbers")
+    if args.report:
+        with open(args.report, "w") as output:
+            json.dump(report, output, indent=2)
+
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "load":
+        return run_load(sys.argv[2:])
+
     token = login()
     HEADERS["Authorization"] = token
 